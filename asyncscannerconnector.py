@@ -0,0 +1,156 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import List, Optional
+# query timeout
+import asyncio
+# async MYSQL database connection (optional dependency)
+try:
+    import aiomysql
+except ModuleNotFoundError:
+    aiomysql = None
+# logging
+import logging
+# tg_raidbot modules
+import metrics
+from scannerconnector import Raid, RdmQueryBuilder, ScannerConnector, register_scannerconnector
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: AsyncRdmConnector
+#****************************************
+@register_scannerconnector("rdm_async")
+@register_scannerconnector("golbat_async")
+class AsyncRdmConnector(RdmQueryBuilder, ScannerConnector):
+    """asyncio RDM connector (aiomysql connection pool). get_raids() has the same contract as RdmConnector.get_raids(), but is a coroutine.
+    Several get_raids() calls can run concurrently (up to pool_size queries at the same time)"""
+    is_async = True
+
+    def __init__(self, db_host:str, db_port:int, db_name:str, db_username:str, db_password:str, gym_id_cache_refresh_cycle_in_s:int=6*3600, pool_size:int=4, db_timeout_in_s:int=30) -> None:
+        if aiomysql is None:
+            log.error("AsyncRdmConnector: python package 'aiomysql' missing. Install it or disable [db] 'async_queries'")
+            raise KeyError
+        super().__init__(gym_id_cache_refresh_cycle_in_s)
+        self._host = db_host
+        self._port = db_port
+        self._db_name = db_name
+        self._username = db_username
+        self._password = db_password
+        self._pool_size = pool_size
+        self._timeout_in_s = db_timeout_in_s
+        self._pool = None
+
+    @classmethod
+    def from_cfg(cls, cfg) -> "AsyncRdmConnector":
+        return cls(db_host=cfg.db_host, db_port=cfg.db_port, db_name=cfg.db_name, db_username=cfg.db_user, db_password=cfg.db_password, gym_id_cache_refresh_cycle_in_s=cfg.db_gym_id_cache_refresh_cycle_in_s, pool_size=cfg.db_async_pool_size, db_timeout_in_s=cfg.db_timeout_in_s)
+
+    def _get_connect_kwargs(self) -> dict:
+        return dict(host = self._host, port = self._port, user = self._username, password = self._password, db = self._db_name, connect_timeout = self._timeout_in_s, autocommit = True)
+
+    async def _detect_query_timeout_statement(self) -> Optional[str]:
+        """return statement limiting query execution time of session to timeout_in_s (MySQL: max_execution_time in ms,
+        MariaDB: max_statement_time in s), see DbConnector._set_query_timeout(). Return None, if database supports none of them"""
+
+        statement_list = [f"SET SESSION max_execution_time = {int(self._timeout_in_s * 1000)}", f"SET SESSION max_statement_time = {self._timeout_in_s}"]
+        connection = await aiomysql.connect(**self._get_connect_kwargs())
+        try:
+            for statement in statement_list:
+                try:
+                    async with connection.cursor() as cursor:
+                        await cursor.execute(statement)
+                    return statement
+                except aiomysql.Error:
+                    pass
+        finally:
+            connection.close()
+        log.warning("AsyncRdmConnector: database supports no query timeout -> scanner queries are only limited by client side [db] timeout_in_s")
+        return None
+
+    async def _get_pool(self):
+        """create connection pool on first use (pool is bound to running event loop)"""
+
+        if self._pool is None:
+            # server side query timeout: a query cancelled by the client doesn't keep running on the database
+            init_command = await self._detect_query_timeout_statement()
+            self._pool = await aiomysql.create_pool(
+                minsize = 1,
+                maxsize = self._pool_size,
+                init_command = init_command,
+                **self._get_connect_kwargs()
+            )
+            log.debug("AsyncRdmConnector: connection pool created (size:%d)", self._pool_size)
+        return self._pool
+
+    async def _execute_query(self, query:str, query_name:str="") -> List[tuple]:
+        """execute SQL query and return all rows as tuples. Return None on errors"""
+
+        try:
+            pool = await self._get_pool()
+            async with pool.acquire() as connection:
+                try:
+                    async with connection.cursor() as cursor:
+                        log.debug("AsyncRdmConnector: SQL query '%s'...", query)
+                        with metrics.db_query_seconds.time(query=query_name):
+                            # a stalled query must not block the whole update cycle
+                            await asyncio.wait_for(cursor.execute(query), timeout=self._timeout_in_s)
+                            result = await cursor.fetchall()
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    # timeout or cancelled task (e.g. deferred raid channel): result is only partly read
+                    # -> close connection, so the pool drops it instead of reusing it
+                    connection.close()
+                    raise
+        except Exception as e:
+            if aiomysql is not None and isinstance(e, aiomysql.OperationalError):
+                # broken connection is dropped by pool -> next query uses a new connection
+                metrics.db_reconnects_total.inc()
+            log.error("AsyncRdmConnector: SQL query error.")
+            log.exception("Exception info:")
+            return None
+        return result
+
+    async def _refresh_gym_ids(self, geofence:str) -> None:
+        """update cached gym id list of geofence, if outdated"""
+
+        if self._is_gym_id_cache_outdated(geofence):
+            rows = await self._execute_query(self._create_gym_ids_query(geofence), query_name="get_gym_ids")
+            self._update_gym_id_cache(geofence, None if rows is None else [row[0] for row in rows])
+
+    async def get_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False) -> List[Raid]:
+        """Return active raids from scanner according provided filter. If you don't want to filter raids by geofence, set geofence = ''"""
+
+        if geofence != "" and geofence_gym_ids:
+            await self._refresh_gym_ids(geofence)
+        sql_query = self._create_raids_query(raidlevel_list, unknown_raids, geofence, order_time_reverse, geofence_gym_ids)
+        rows = await self._execute_query(sql_query, query_name="get_raids")
+        return [] if rows is None else [Raid._make(row) for row in rows]
+
+    async def get_all_raids(self, raidlevel_list:List[int]) -> Optional[List[Raid]]:
+        """Return all active raids of the raid levels (no geofence). Unlike get_raids(), None is returned if the scanner query failed"""
+
+        rows = await self._execute_query(self._create_raids_query(raidlevel_list, True, "", False, False), query_name="get_all_raids")
+        return None if rows is None else [Raid._make(row) for row in rows]
+
+    async def close(self) -> None:
+        """close connection pool"""
+
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
@@ -0,0 +1,86 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import Iterator, List
+# time handling
+import time
+# random raid data
+import random
+# logging
+import logging
+# tg_raidbot modules
+from scannerconnector import MemoryConnector, Raid
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+# benchmark area: rectangle lat/lon bounds
+AREA_LAT = (50.0, 50.2)
+AREA_LON = (8.0, 8.4)
+
+'''
+****************************************
+* Module functions
+****************************************
+'''
+def create_district_geofence(rnd:random.Random, size:float=0.05) -> str:
+    """create a random rectangular geofence string inside benchmark area"""
+    lat = rnd.uniform(AREA_LAT[0], AREA_LAT[1] - size)
+    lon = rnd.uniform(AREA_LON[0], AREA_LON[1] - size)
+    corners = [(lat, lon), (lat, lon + size), (lat + size, lon + size), (lat + size, lon), (lat, lon)]
+    return ", ".join(f"{corner_lat} {corner_lon}" for corner_lat, corner_lon in corners)
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: FakeRdmConnector
+#****************************************
+class FakeRdmConnector(MemoryConnector):
+    """In-memory scanner with N gyms and M active raids (random, but reproducible by seed) and optional query latency"""
+
+    def __init__(self, gym_count:int, raid_count:int, raidlevel_list:List[int]=None, seed:int=0, query_latency_in_s:float=0.0) -> None:
+        super().__init__()
+        if raidlevel_list is None:
+            raidlevel_list = [1, 3, 5, 6]
+        rnd = random.Random(seed)
+        now = int(time.time())
+        self._query_latency_in_s = query_latency_in_s
+        for gym_index in rnd.sample(range(gym_count), min(raid_count, gym_count)):
+            battle_timestamp = now + rnd.randint(-2700, 3600)
+            is_egg = battle_timestamp > now
+            self.upsert_raid(f"gym{gym_index}", Raid(
+                gym_name = f"Gym {gym_index}" if rnd.random() > 0.05 else None,
+                raid_level = rnd.choice(raidlevel_list),
+                raid_pokemon_id = 0 if is_egg else rnd.randint(1, 900),
+                raid_battle_timestamp = battle_timestamp,
+                raid_end_timestamp = battle_timestamp + 2700,
+                atk_fast = 0 if is_egg else rnd.randint(200, 300),
+                atk_charge = 0 if is_egg else rnd.randint(10, 150),
+                lat = rnd.uniform(*AREA_LAT),
+                lon = rnd.uniform(*AREA_LON)
+            ))
+
+    def iter_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False, batch_size:int=100) -> Iterator[Raid]:
+        if self._query_latency_in_s:
+            time.sleep(self._query_latency_in_s)
+        return super().iter_raids(raidlevel_list, unknown_raids, geofence, order_time_reverse, geofence_gym_ids, batch_size)
+
+    def change_raids(self, change_fraction:float, rnd:random.Random) -> None:
+        """simulate scanner updates between cycles: new raid boss (egg hatched) for change_fraction of all raids"""
+        with self._lock:
+            gym_key_list = list(self._raid_dict.keys())
+        for gym_key in rnd.sample(gym_key_list, int(len(gym_key_list) * change_fraction)):
+            raid = self._raid_dict[gym_key]
+            self.upsert_raid(gym_key, raid._replace(raid_pokemon_id=rnd.randint(1, 900), atk_fast=rnd.randint(200, 300), atk_charge=rnd.randint(10, 150)))
@@ -0,0 +1,126 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import Dict
+# time handling
+import time
+# random 429 injection
+import random
+# local http server
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+# logging
+import logging
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+NOT_MODIFIED_DESCRIPTION = "Bad Request: message is not modified: specified new message content and reply markup are exactly the same as a current content and reply markup of the message"
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: FakeTelegramServer
+#****************************************
+class FakeTelegramServer():
+    """Local Telegram bot API stand-in with configurable latency and 429 injection.
+
+    Supports sendMessage, editMessageText, pinChatMessage and deleteMessage. Use url as api_url of SimpleTelegramApi.
+    """
+
+    def __init__(self, latency_in_s:float=0.0, ratelimit_probability:float=0.0, retry_after_in_s:int=1, seed:int=0, host:str="127.0.0.1", port:int=0) -> None:
+        self.latency_in_s = latency_in_s
+        self.ratelimit_probability = ratelimit_probability
+        self.retry_after_in_s = retry_after_in_s
+        self.request_count = {}
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        # chat_id -> last message_id, (chat_id, message_id) -> text
+        self._last_message_id = {}
+        self._messages = {}
+        handler = type("FakeTelegramRequestHandler", (_FakeTelegramRequestHandler,), {"fake_server": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-telegram", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def handle(self, method:str, params:Dict) -> Dict:
+        """process one bot API call and return response dict"""
+        if self.latency_in_s:
+            time.sleep(self.latency_in_s)
+        with self._lock:
+            self.request_count[method] = self.request_count.get(method, 0) + 1
+            if self.ratelimit_probability and self._rnd.random() < self.ratelimit_probability:
+                return {"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {self.retry_after_in_s}", "parameters": {"retry_after": self.retry_after_in_s}}
+            chat_id = params.get("chat_id", "")
+            if method == "sendMessage":
+                message_id = self._last_message_id.get(chat_id, 0) + 1
+                self._last_message_id[chat_id] = message_id
+                self._messages[(chat_id, message_id)] = params.get("text", "")
+                return {"ok": True, "result": {"message_id": message_id, "chat": {"id": chat_id}, "text": params.get("text", "")}}
+            if method == "editMessageText":
+                key = (chat_id, int(params.get("message_id", 0)))
+                if key not in self._messages:
+                    return {"ok": False, "error_code": 400, "description": "Bad Request: message to edit not found"}
+                if self._messages[key] == params.get("text", ""):
+                    return {"ok": False, "error_code": 400, "description": NOT_MODIFIED_DESCRIPTION}
+                self._messages[key] = params.get("text", "")
+                return {"ok": True, "result": {"message_id": key[1], "chat": {"id": chat_id}, "text": params.get("text", "")}}
+            if method == "pinChatMessage":
+                # pin creates a service message in the chat
+                self._last_message_id[chat_id] = self._last_message_id.get(chat_id, 0) + 1
+                return {"ok": True, "result": True}
+            if method == "deleteMessage":
+                self._messages.pop((chat_id, int(params.get("message_id", 0))), None)
+                return {"ok": True, "result": True}
+            return {"ok": False, "error_code": 404, "description": "Not Found"}
+
+class _FakeTelegramRequestHandler(BaseHTTPRequestHandler):
+    fake_server = None
+
+    def _handle_request(self, params:Dict) -> None:
+        method = urlsplit(self.path).path.rsplit("/", 1)[-1]
+        response = self.fake_server.handle(method, params)
+        body = json.dumps(response).encode("utf8")
+        self.send_response(200 if response["ok"] else response["error_code"])
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        params = {key: values[-1] for key, values in parse_qs(urlsplit(self.path).query).items()}
+        self._handle_request(params)
+
+    def do_POST(self) -> None:
+        content = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        params = json.loads(content) if content else {}
+        self._handle_request({key: str(value) for key, value in params.items()})
+
+    def log_message(self, format, *args) -> None:
+        pass
@@ -0,0 +1,193 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import Dict, List
+import argparse
+import sys
+# time handling
+import time
+# random scenario data
+import random
+# temporary config + cache files
+import os
+import tempfile
+# memory measurement
+import tracemalloc
+# logging
+import logging
+# tg_raidbot modules (run from repository root: python -m benchmark.run_benchmark)
+import tg_raidbot
+import metrics
+from cfg import Cfg
+from msgidcache import MsgIdCache
+from pogodata import Pogodata
+from simpletelegramapi import SimpleTelegramApi
+from benchmark.fakescanner import FakeRdmConnector, create_district_geofence
+from benchmark.faketelegram import FakeTelegramServer
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+TELEGRAM_METHODS = ["sendMessage", "editMessageText", "pinChatMessage", "deleteMessage"]
+EDIT_RESULTS = ["sent", "skipped", "failed", "deferred"]
+CONFIG_TEMPLATE = """
+[general]
+token = "123456789:BENCHMARK"
+[db]
+host = "localhost"
+name = "rdmdb"
+user = "rdmuser"
+password = "rdmuser_password"
+[format]
+language = "en"
+[templates]
+tmpl_msglimit_reached_msg = "\\n...msg too long"
+tmpl_no_raid_msg = "No raids"
+tmpl_grouped_title_msg = "\\n<b><u>${raidlvl_name}:</u></b>"
+tmpl_raidegg_msg = "${raidlvl_num}* ${time_start}-${time_end}\\n<a href='${gmaps_url}'>${gym_name}</a>"
+tmpl_raid_msg = "${pokemon_name} ${time_start}-${time_end}\\n${atk_fast}/${atk_charge}\\n<a href='${gmaps_url}'>${gym_name}</a>"
+"""
+
+'''
+****************************************
+* Module functions
+****************************************
+'''
+def create_config_file(directory:str, channel_count:int, rnd:random.Random) -> str:
+    """write benchmark config.toml with channel_count [[raidconfig]] tables and return path"""
+    config_str = CONFIG_TEMPLATE
+    for channel_index in range(channel_count):
+        config_str += f"""
+[[raidconfig]]
+chat_id = "-100{channel_index}"
+raidlevel = [5,6,3,1]
+geofence = "{create_district_geofence(rnd)}"
+raidlevel_grouping = {"true" if channel_index % 2 == 0 else "false"}
+"""
+    path = os.path.join(directory, "config.toml")
+    with open(path, "w") as f:
+        f.write(config_str)
+    return path
+
+def create_pogodata() -> Pogodata:
+    """create Pogodata with generated translation data (no network access)"""
+    pogodata = Pogodata("en")
+    translations = {f"poke_{pokemon_id}": f"Pokemon{pokemon_id}" for pokemon_id in range(1, 1000)}
+    translations.update({f"move_{move_id}": f"Move{move_id}" for move_id in range(1, 400)})
+    for raidlevel in range(1, 16):
+        translations.update({f"raid_{raidlevel}": f"Level {raidlevel} Raid", f"raid_{raidlevel}_plural": f"Level {raidlevel} Raids"})
+    pogodata._pogodata_json = translations
+    return pogodata
+
+def setup_bot(directory:str, channel_count:int, scannerconnector, tgapi:SimpleTelegramApi, seed:int=0) -> tg_raidbot.TelegramRaidbot:
+    """create TelegramRaidbot like TelegramRaidbot.run() does, but with provided stand-ins and generated config"""
+    config_path = create_config_file(directory, channel_count, random.Random(seed))
+    tg_raidbot.cfg = Cfg(config_path)
+    tg_raidbot.cfg.load()
+    bot = tg_raidbot.TelegramRaidbot()
+    bot._compile_templates()
+    bot._msgidcache = MsgIdCache(os.path.join(directory, ".msgid_cache"))
+    bot.raidchannel_list = [tg_raidbot.RaidChannel(raidconfig) for raidconfig in tg_raidbot.cfg.raidconfig_list]
+    bot._scannerconnector = scannerconnector
+    bot._tgapi = tgapi
+    bot._pogodata = create_pogodata()
+    return bot
+
+def snapshot_stage_metrics() -> Dict[str, List[float]]:
+    """return [sum, count] of all per-stage histograms"""
+    stages = {
+        "db_query": [metrics.db_query_seconds.get_sum(query="get_raids"), metrics.db_query_seconds.get_count(query="get_raids")],
+        "render": [metrics.render_seconds.get_sum(), metrics.render_seconds.get_count()],
+        "cycle": [metrics.cycle_seconds.get_sum(), metrics.cycle_seconds.get_count()]
+    }
+    for method in TELEGRAM_METHODS:
+        stages[f"tg_{method}"] = [metrics.telegram_request_seconds.get_sum(method=method), metrics.telegram_request_seconds.get_count(method=method)]
+    return stages
+
+def run_scenario(channel_count:int, raid_count:int, cycles:int, tg_latency_in_s:float, ratelimit_probability:float, db_latency_in_s:float, change_fraction:float=0.1, seed:int=0) -> Dict:
+    """run cycles x update_raids() for one scenario and return results. change_fraction of raids change before every cycle,
+    unchanged raid messages aren't edited (hash skip)"""
+    fake_server = FakeTelegramServer(latency_in_s=tg_latency_in_s, ratelimit_probability=ratelimit_probability, seed=seed)
+    fake_server.start()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            scannerconnector = FakeRdmConnector(gym_count=raid_count * 4, raid_count=raid_count, seed=seed, query_latency_in_s=db_latency_in_s)
+            tgapi = SimpleTelegramApi("123456789:BENCHMARK", api_url=fake_server.url)
+            bot = setup_bot(directory, channel_count, scannerconnector, tgapi, seed)
+            # first cycle sends all new messages -> measure steady state (edit) cycles separately
+            bot.update_raids()
+            stages_before = snapshot_stage_metrics()
+            edits_before = {result: metrics.edits_total.get(result=result) for result in EDIT_RESULTS}
+            change_rnd = random.Random(seed)
+            duration = 0.0
+            for _ in range(cycles):
+                scannerconnector.change_raids(change_fraction, change_rnd)
+                start = time.perf_counter()
+                bot.update_raids()
+                duration += time.perf_counter() - start
+            stages_after = snapshot_stage_metrics()
+            edits = {result: int(metrics.edits_total.get(result=result) - edits_before[result]) for result in EDIT_RESULTS}
+            # memory: separate (untimed) cycle, tracemalloc slows down allocations a lot
+            scannerconnector.change_raids(change_fraction, change_rnd)
+            tracemalloc.start()
+            bot.update_raids()
+            _, memory_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        fake_server.stop()
+    stage_latency = {}
+    for stage, (stage_sum, stage_count) in stages_after.items():
+        count = stage_count - stages_before[stage][1]
+        if count:
+            stage_latency[stage] = ((stage_sum - stages_before[stage][0]) / count, count)
+    return {
+        "channels": channel_count,
+        "raids": raid_count,
+        "cycles_per_s": cycles / duration,
+        "cycle_s": duration / cycles,
+        "memory_peak_mb": memory_peak / 2**20,
+        "stages": stage_latency,
+        "edits": edits,
+        "tg_requests": dict(fake_server.request_count)
+    }
+
+def print_result(result:Dict) -> None:
+    print(f"channels:{result['channels']:5d} raids:{result['raids']:6d} | cycles/s:{result['cycles_per_s']:8.3f} cycle:{result['cycle_s']*1000:9.1f}ms | memory peak:{result['memory_peak_mb']:7.2f}MB")
+    for stage, (mean, count) in result["stages"].items():
+        print(f"    {stage:20s} mean:{mean*1000:9.3f}ms  n:{count}")
+    print(f"    raid message edits: {result['edits']}")
+    print(f"    telegram requests: {result['tg_requests']}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="offline tg_raidbot benchmark: update_raids() against fake scanner db and fake Telegram server")
+    parser.add_argument('-c', '--channels', default=[10, 100, 1000], type=int, nargs='+', help='channel counts to benchmark. Default: 10 100 1000')
+    parser.add_argument('-r', '--raids', default=[1000, 10000], type=int, nargs='+', help='active raid counts to benchmark. Default: 1000 10000')
+    parser.add_argument('-n', '--cycles', default=3, type=int, help='measured update_raids() cycles per scenario. Default: 3')
+    parser.add_argument('--tg-latency-ms', default=0.0, type=float, help='fake Telegram server latency per request. Default: 0')
+    parser.add_argument('--db-latency-ms', default=0.0, type=float, help='fake scanner latency per query. Default: 0')
+    parser.add_argument('--ratelimit-probability', default=0.0, type=float, help='probability of a 429 response per Telegram request. Default: 0')
+    parser.add_argument('--change-fraction', default=0.1, type=float, help='fraction of raids changed before every measured cycle (0: only unchanged messages -> no edits). Default: 0.1')
+    parser.add_argument('--seed', default=0, type=int, help='random seed for scenario data. Default: 0')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+
+    for raid_count in args.raids:
+        for channel_count in args.channels:
+            result = run_scenario(channel_count, raid_count, args.cycles, args.tg_latency_ms / 1000, args.ratelimit_probability, args.db_latency_ms / 1000, args.change_fraction, args.seed)
+            print_result(result)
+
+'''
+****************************************
+* main functions
+****************************************
+'''
+if __name__ == "__main__":
+    main()
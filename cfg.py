@@ -6,7 +6,9 @@
 * Import
 ****************************************
 '''
-from typing import Dict, List
+from typing import Dict, List, Set, Tuple
+# file modification time
+import os
 # data processing
 try:
     import tomllib
@@ -24,6 +26,8 @@ import logging
 ****************************************
 '''
 log = logging.getLogger(__name__)
+# parameter (prefixes), which can't be changed by reload() -> need restart
+RESTART_PARAMETER_PREFIXES = ("api_token", "telegram_", "db_", "webhook_")
 
 '''
 ****************************************
@@ -75,15 +79,15 @@ class Cfg():
         except tomllib.TOMLDecodeError:
             log.error("toml file can't be decoded. Check TOML syntax")
         except FileNotFoundError:
-            log.error(f"Can't find file '{filepath}'. Check, if file exists")
+            log.error(f"Can't find file '{self._config_filepath}'. Check, if file exists")
         except Exception:
-            log.exception("Unexpected exception at loading {filepath}")
+            log.exception(f"Unexpected exception at loading {self._config_filepath}")
         return toml_dict
 
     def load(self) -> None:
         """load TOML file and parse parameter
 
-        All parameter will be available as public members of Cfg object. Function should be called only once on startup.
+        All parameter will be available as public members of Cfg object. Function should be called only once on startup, use reload() afterwards.
 
         Raises:
             KeyError: an error occurred during parsing configuration parameter (e.g. missing values, etc)
@@ -97,13 +101,34 @@ class Cfg():
         self.sleep_mainloop_in_s = Cfg._get_value(cfg_dict, ["general","raidupdate_cycle_in_s"], fallback=60)
         self.pogodata_update_cycle_in_s = Cfg._get_value(cfg_dict, ["general","pogodata_update_cycle_in_h"], fallback=24) * 3600
         self.api_token = Cfg._get_value(cfg_dict, ["general", "token"])
-
-        # [db]: database settings
-        self.db_host = Cfg._get_value(cfg_dict, ["db", "host"])
-        self.db_name = Cfg._get_value(cfg_dict, ["db", "name"])
-        self.db_user = Cfg._get_value(cfg_dict, ["db", "user"])
-        self.db_password = Cfg._get_value(cfg_dict, ["db", "password"])
+        self.warm_start = Cfg._get_value(cfg_dict, ["general", "warm_start"], fallback=False)
+        # 0: deadline is raidupdate_cycle_in_s
+        self.cycle_deadline_in_s = Cfg._get_value(cfg_dict, ["general", "cycle_deadline_in_s"], fallback=0)
+        self.telegram_timeout_in_s = Cfg._get_value(cfg_dict, ["general", "telegram_timeout_in_s"], fallback=10)
+        # high priority raid channels (updated first, never deferred): raids >= priority_raidlevel or changed within priority_recent_change_in_s
+        self.priority_raidlevel = Cfg._get_value(cfg_dict, ["general", "priority_raidlevel"], fallback=5)
+        self.priority_recent_change_in_s = Cfg._get_value(cfg_dict, ["general", "priority_recent_change_in_s"], fallback=600)
+
+        # [db]: database settings (connection parameter not needed for 'memory' scanner type)
+        self.db_type = Cfg._get_value(cfg_dict, ["db", "type"], fallback="rdm")
+        db_fallback = "" if self.db_type == "memory" else None
+        self.db_host = Cfg._get_value(cfg_dict, ["db", "host"], fallback=db_fallback)
+        self.db_name = Cfg._get_value(cfg_dict, ["db", "name"], fallback=db_fallback)
+        self.db_user = Cfg._get_value(cfg_dict, ["db", "user"], fallback=db_fallback)
+        self.db_password = Cfg._get_value(cfg_dict, ["db", "password"], fallback=db_fallback)
         self.db_port = Cfg._get_value(cfg_dict, ["db", "port"], fallback=3306)
+        self.db_gym_id_cache_refresh_cycle_in_s = Cfg._get_value(cfg_dict, ["db", "gym_id_cache_refresh_cycle_in_h"], fallback=6) * 3600
+        self.db_async_queries = Cfg._get_value(cfg_dict, ["db", "async_queries"], fallback=False)
+        self.db_async_pool_size = Cfg._get_value(cfg_dict, ["db", "async_pool_size"], fallback=4)
+        self.db_timeout_in_s = Cfg._get_value(cfg_dict, ["db", "timeout_in_s"], fallback=30)
+        self.db_json_file = Cfg._get_value(cfg_dict, ["db", "json_file"], fallback="")
+
+        # [webhook]: optional push based raid ingestion
+        self.webhook_enabled = Cfg._get_value(cfg_dict, ["webhook", "enabled"], fallback=False)
+        self.webhook_host = Cfg._get_value(cfg_dict, ["webhook", "host"], fallback="127.0.0.1")
+        self.webhook_port = Cfg._get_value(cfg_dict, ["webhook", "port"], fallback=4300)
+        self.webhook_reconcile_cycle_in_s = Cfg._get_value(cfg_dict, ["webhook", "reconcile_cycle_in_s"], fallback=600)
+        self.webhook_debounce_in_s = Cfg._get_value(cfg_dict, ["webhook", "debounce_in_s"], fallback=2)
 
         # [koji]: koji settings
         self.koji_api_link = Cfg._get_value(cfg_dict, ["koji", "api_link"], fallback="")
@@ -135,6 +160,7 @@ class Cfg():
                 "raidlevel_grouping": Cfg._get_value(cfg_raidconfig, ["raidlevel_grouping"], fallback = True),
                 "geofence": Cfg._get_value(cfg_raidconfig, ["geofence"], fallback = ""),
                 "geofence_koji": Cfg._get_value(cfg_raidconfig, ["geofence_koji"], fallback = ""),
+                "geofence_gym_ids": Cfg._get_value(cfg_raidconfig, ["geofence_gym_ids"], fallback = False),
                 "order_time_reverse": Cfg._get_value(cfg_raidconfig, ["order_time_reverse"], fallback = False),
                 "pin_msg": Cfg._get_value(cfg_raidconfig, ["pin_msg"], fallback = True)
             }
@@ -147,3 +173,50 @@ class Cfg():
                 log.error("[[raidconfig]] parameter issue: 'geofence_koji' parameter set, but [koji] parameter 'api_link' not set")
                 raise KeyError
             self.raidconfig_list.append(raidconfig_dict)
+
+    def get_file_mtime(self) -> float:
+        """return modification time of configuration file (0, if not available)"""
+
+        try:
+            return os.path.getmtime(self._config_filepath)
+        except OSError:
+            return 0
+
+    def load_changes(self) -> Tuple["Cfg", Set[str]]:
+        """load TOML file into a new Cfg object and return it together with the names of all changed parameter, which don't need a restart.
+        Nothing is taken over, see apply_changes()
+
+        Raises:
+            KeyError: an error occurred during parsing configuration parameter (e.g. missing values, etc)
+        """
+
+        new_cfg = Cfg(self._config_filepath)
+        new_cfg.load()
+        changed_parameter_set = set()
+        for name, value in vars(new_cfg).items():
+            if getattr(self, name, None) == value:
+                continue
+            if name.startswith(RESTART_PARAMETER_PREFIXES):
+                log.warning(f"Parameter '{name}' changed: restart needed to take over new value")
+                continue
+            changed_parameter_set.add(name)
+        return new_cfg, changed_parameter_set
+
+    def apply_changes(self, new_cfg:"Cfg", changed_parameter_set:Set[str]) -> None:
+        """take over changed parameter of load_changes()"""
+
+        for name in changed_parameter_set:
+            setattr(self, name, getattr(new_cfg, name))
+
+    def reload(self) -> Set[str]:
+        """reload TOML file and take over all changed parameter, which don't need a restart. Return set of changed parameter names.
+
+        Parameter are only taken over, if the complete file was parsed successfully.
+
+        Raises:
+            KeyError: an error occurred during parsing configuration parameter (e.g. missing values, etc). No parameter was changed.
+        """
+
+        new_cfg, changed_parameter_set = self.load_changes()
+        self.apply_changes(new_cfg, changed_parameter_set)
+        return changed_parameter_set
@@ -0,0 +1,83 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+# sampling counter
+import itertools
+# logging
+import logging
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+DEFAULT_MAX_PAYLOAD_LEN = 500
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: Truncated
+#****************************************
+class Truncated():
+    """Lazy log argument for (large) payloads.
+
+    The payload string is only built, if the log record is really emitted (use with %-style logging args).
+    Lists and tuples are rendered item by item, so only the first items needed for max_len are formatted.
+    """
+    __slots__ = ("_payload", "_max_len")
+
+    def __init__(self, payload, max_len:int=DEFAULT_MAX_PAYLOAD_LEN) -> None:
+        self._payload = payload
+        self._max_len = max_len
+
+    def __str__(self) -> str:
+        payload = self._payload
+        if isinstance(payload, (list, tuple)):
+            parts = []
+            text_len = 0
+            for index, item in enumerate(payload):
+                item_str = repr(item)
+                parts.append(item_str)
+                text_len += len(item_str) + 2
+                if text_len > self._max_len:
+                    return f"[{', '.join(parts)[:self._max_len]}...] ({len(payload) - index - 1} of {len(payload)} items not logged)"
+            return f"[{', '.join(parts)}]"
+        text = str(payload)
+        if len(text) > self._max_len:
+            text = f"{text[:self._max_len]}... ({len(text) - self._max_len} chars not logged)"
+        return text
+
+#****************************************
+# Class: LogSampler
+#****************************************
+class LogSampler():
+    """Sample log records: calling the sampler returns True for every n-th call (first call included)"""
+
+    def __init__(self, every_n:int=10) -> None:
+        self._every_n = max(1, every_n)
+        self._counter = itertools.count()
+
+    def __call__(self) -> bool:
+        return next(self._counter) % self._every_n == 0
+
+'''
+****************************************
+* Module functions
+****************************************
+'''
+def log_payload(logger:logging.Logger, msg:str, payload, sampler:LogSampler=None, max_len:int=DEFAULT_MAX_PAYLOAD_LEN, level:int=logging.DEBUG) -> None:
+    """log a (large) payload truncated to max_len chars. Nothing is formatted, if level is disabled or record is not sampled.
+    msg need to contain exactly one '%s' placeholder for the payload."""
+
+    if logger.isEnabledFor(level) and (sampler is None or sampler()):
+        logger.log(level, msg, Truncated(payload, max_len))
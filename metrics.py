@@ -0,0 +1,261 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import Callable, Dict, List, Tuple
+# time handling
+import time
+# thread safety + http endpoint
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+# logging
+import logging
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: _Metric
+#****************************************
+class _Metric():
+    """base class for all metric types: labeled values + prometheus text rendering"""
+    metric_type = ""
+
+    def __init__(self, name:str, documentation:str, labelnames:Tuple[str, ...]=()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _label_key(self, labels:Dict) -> Tuple[str, ...]:
+        """create (ordered) label value tuple from label keyword arguments"""
+        return tuple(str(labels.get(labelname, "")) for labelname in self.labelnames)
+
+    def _format_labels(self, label_key:Tuple[str, ...], extra:Dict=None) -> str:
+        """create prometheus label string '{a="x",b="y"}'"""
+        pairs = [f'{name}="{value}"' for name, value in zip(self.labelnames, label_key)]
+        if extra:
+            pairs += [f'{name}="{value}"' for name, value in extra.items()]
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """render metric in prometheus text exposition format"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            lines += self._samples()
+        return "\n".join(lines)
+
+#****************************************
+# Class: Counter
+#****************************************
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def __init__(self, name:str, documentation:str, labelnames:Tuple[str, ...]=()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount:float=1, **labels) -> None:
+        """increase counter (of label combination) by amount"""
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._label_key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._values.items()]
+
+#****************************************
+# Class: Gauge
+#****************************************
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def __init__(self, name:str, documentation:str, labelnames:Tuple[str, ...]=()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def set(self, value:float, **labels) -> None:
+        """set gauge (of label combination) to value"""
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount:float=1, **labels) -> None:
+        key = self._label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount:float=1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._label_key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {value}" for key, value in self._values.items()]
+
+#****************************************
+# Class: Histogram
+#****************************************
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name:str, documentation:str, labelnames:Tuple[str, ...]=(), buckets:Tuple[float, ...]=DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._values = {}
+
+    def observe(self, value:float, **labels) -> None:
+        """add one observation (in seconds) to histogram (of label combination)"""
+        key = self._label_key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = [0] * (len(self._buckets) + 2)
+                self._values[key] = data
+            for index, upper_bound in enumerate(self._buckets):
+                if value <= upper_bound:
+                    data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+
+    def time(self, **labels) -> "_HistogramTimer":
+        """context manager: observe duration of with-block"""
+        return _HistogramTimer(self, labels)
+
+    def get_count(self, **labels) -> int:
+        data = self._values.get(self._label_key(labels))
+        return data[-1] if data else 0
+
+    def get_sum(self, **labels) -> float:
+        data = self._values.get(self._label_key(labels))
+        return data[-2] if data else 0.0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, data in self._values.items():
+            for index, upper_bound in enumerate(self._buckets):
+                lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': upper_bound})} {data[index]}")
+            lines.append(f"{self.name}_bucket{self._format_labels(key, {'le': '+Inf'})} {data[-1]}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {data[-2]}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {data[-1]}")
+        return lines
+
+class _HistogramTimer():
+    def __init__(self, histogram:Histogram, labels:Dict) -> None:
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "_HistogramTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.duration = time.perf_counter() - self._start
+        self._histogram.observe(self.duration, **self._labels)
+
+#****************************************
+# Class: MetricsRegistry
+#****************************************
+class MetricsRegistry():
+    def __init__(self) -> None:
+        self._metrics = []
+
+    def register(self, metric:_Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """render all registered metrics in prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = None
+    # additional endpoints: path -> callback(query parameter dict) returning response text
+    actions = {}
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path in self.actions:
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                body = self.actions[url.path](params).encode("utf8")
+            except ValueError:
+                self.send_error(400)
+                return
+        elif url.path in ("/", "/metrics"):
+            body = self.registry.render().encode("utf8")
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        # route http.server access log into debug log instead of stderr
+        log.debug("metrics endpoint: " + format, *args)
+
+'''
+****************************************
+* Metrics
+****************************************
+'''
+registry = MetricsRegistry()
+
+# histograms
+db_query_seconds = registry.register(Histogram("tg_raidbot_db_query_seconds", "Latency of scanner database queries", ("query",)))
+render_seconds = registry.register(Histogram("tg_raidbot_render_seconds", "Time to render the raid message of one channel"))
+telegram_request_seconds = registry.register(Histogram("tg_raidbot_telegram_request_seconds", "Latency of Telegram bot API calls", ("method",)))
+cycle_seconds = registry.register(Histogram("tg_raidbot_cycle_seconds", "Total duration of one update_raids() cycle"))
+# counters
+edits_total = registry.register(Counter("tg_raidbot_edits_total", "Raid message edits by result (sent, skipped, failed, deferred)", ("result",)))
+telegram_ratelimit_total = registry.register(Counter("tg_raidbot_telegram_ratelimit_total", "Telegram responses with error code 429", ("method",)))
+db_reconnects_total = registry.register(Counter("tg_raidbot_db_reconnects_total", "Scanner database reconnects after a failed or lost connection"))
+webhook_raids_total = registry.register(Counter("tg_raidbot_webhook_raids_total", "Raids received by webhook receiver"))
+cycle_overruns_total = registry.register(Counter("tg_raidbot_cycle_overruns_total", "Update cycles, which took longer than raidupdate_cycle_in_s"))
+deferred_channels_total = registry.register(Counter("tg_raidbot_deferred_channels_total", "Low priority raid channels deferred to next cycle, because cycle deadline was exceeded"))
+# gauges
+shown_raids = registry.register(Gauge("tg_raidbot_shown_raids", "Raids rendered into the last raid message of a channel (raids beyond the message length limit aren't fetched)", ("chat_id", "message_thread_id")))
+queue_depth = registry.register(Gauge("tg_raidbot_queue_depth", "Raid channels still waiting for update in the running cycle"))
+startup_seconds = registry.register(Gauge("tg_raidbot_startup_seconds", "Time from start of run() until first raid update cycle is finished"))
+
+'''
+****************************************
+* Module functions
+****************************************
+'''
+def start_http_server(port:int, host:str="127.0.0.1", actions:Dict[str, Callable[[Dict], str]]=None) -> ThreadingHTTPServer:
+    """start metrics http endpoint in a daemon thread and return server object.
+    actions: additional endpoints (path -> callback(query parameter dict) returning response text, ValueError -> 400)"""
+    handler = type("MetricsRequestHandler", (_MetricsRequestHandler,), {"registry": registry, "actions": dict(actions or {})})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    log.info(f"metrics endpoint started on http://{host}:{port}/metrics")
+    return server
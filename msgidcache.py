@@ -20,6 +20,8 @@ import logging
 ****************************************
 '''
 log = logging.getLogger(__name__)
+# cache file key of pinned message ids
+PINNED_KEY = "_pinned"
 
 '''
 ****************************************
@@ -30,7 +32,7 @@ class MsgIdCache():
     def __init__(self, filename:str=".msgid_cache"):
         self._filename = filename
         self._msgid_cache_dict = {}
-        pass
+        self._pinned_msgid_dict = {}
 
     def _create_key_string(self, chat_id:str, message_thread_id:int=0) -> str:
         """create key string"""
@@ -46,6 +48,10 @@ class MsgIdCache():
             f = open(self._filename, "r")
             msgid_cache_file = json.load(f)
             f.close()
+            self._pinned_msgid_dict = msgid_cache_file.pop(PINNED_KEY, None)
+            if self._pinned_msgid_dict is None:
+                # cache file of older version: messages were pinned on creation
+                self._pinned_msgid_dict = dict(msgid_cache_file)
             self._msgid_cache_dict = msgid_cache_file
             log.info(f"load .msgid_cache: {self._msgid_cache_dict}")
         except Exception as e:
@@ -55,8 +61,8 @@ class MsgIdCache():
         """save MsgIdCache dict into cachefile"""
         try:
             f = open(self._filename, "w")
-            json.dump(self._msgid_cache_dict, f)
-            log.debug(f"save .msgid_cache: {self._msgid_cache_dict}")
+            json.dump({**self._msgid_cache_dict, PINNED_KEY: self._pinned_msgid_dict}, f)
+            log.debug("save .msgid_cache: %s", self._msgid_cache_dict)
             f.close()
         except Exception as e:
             log.warning(f"Exception '{type(e)}' in _save_msgid_cache_dict()")
@@ -80,3 +86,18 @@ class MsgIdCache():
             log.exception(f"get_message_id() exception")
         return message_id
 
+    def set_pinned_message_id(self, chat_id:str, message_thread_id:int, message_id:int) -> None:
+        """remember message_id as pinned message of chat/message thread"""
+        key = self._create_key_string(chat_id, message_thread_id)
+        self._pinned_msgid_dict.update({key: message_id})
+
+    def get_pinned_message_id(self, chat_id:str, message_thread_id:int=0) -> int:
+        """get message_id of last pinned message of chat/message thread (None, if unknown)"""
+        key = self._create_key_string(chat_id, message_thread_id)
+        return self._pinned_msgid_dict.get(key)
+
+    def is_raid_message_id(self, chat_id:str, message_id:int) -> bool:
+        """check, if message_id is the raid message of any message thread of chat (topics of a supergroup share message ids)"""
+        chat_key = self._create_key_string(chat_id)
+        return any(cached_message_id == message_id for key, cached_message_id in self._msgid_cache_dict.items()
+                   if key == chat_key or key.startswith(chat_key + ":"))
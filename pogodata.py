@@ -19,6 +19,7 @@ import logging
 ****************************************
 '''
 log = logging.getLogger(__name__)
+REQUEST_TIMEOUT_IN_S = 30
 
 '''
 ****************************************
@@ -32,6 +33,7 @@ log = logging.getLogger(__name__)
 class Pogodata():
     def __init__(self, language:str):
         self._pogodata_json = {}
+        self.language = language
         self._url = f"https://raw.githubusercontent.com/WatWowMap/pogo-translations/master/static/locales/{language}.json"
 
     def _get_name_by_id(self, search_name_pre:str, id_num:int, search_name_post:str="") -> str:
@@ -44,9 +46,9 @@ class Pogodata():
             try:
                 #find pokemon
                 dict_key = f"{search_name_pre}{id_num}{search_name_post}"
-                if dict_key in self._pogodata_json.keys():
-                    name = self._pogodata_json[dict_key]
-                    log.debug(f"name found: {search_name_pre}{id_num}{search_name_post}='{name}'")
+                name = self._pogodata_json.get(dict_key)
+                if name is not None:
+                    log.debug("name found: %s='%s'", dict_key, name)
             except Exception:
                 log.exception("Exception in _get_name_by_id()")
         return name
@@ -55,7 +57,7 @@ class Pogodata():
         """update pogodata translation json from external url"""
 
         try:
-            request_response = requests.get(self._url)
+            request_response = requests.get(self._url, timeout=REQUEST_TIMEOUT_IN_S)
             if request_response.ok:
                 decoded_response = request_response.content.decode("utf8")
                 self._pogodata_json = json.loads(decoded_response)
@@ -63,6 +65,15 @@ class Pogodata():
         except Exception:
             log.exception("Exception in update_data()")
 
+    def get_translations(self) -> dict:
+        """Return actual translation data (e.g. for warm start snapshot)"""
+        return self._pogodata_json
+
+    def set_translations(self, translations:dict) -> None:
+        """Use translation data (e.g. from warm start snapshot) until next update()"""
+        if isinstance(translations, dict):
+            self._pogodata_json = translations
+
     def get_pokemon_name(self, pokemon_id:int) -> str:
         """Return translated pokemon name string for given pokemon_id"""
 
@@ -0,0 +1,174 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import List, Tuple
+# time handling
+import time
+from datetime import datetime
+# profiling
+import cProfile
+import pstats
+import tracemalloc
+import io
+# os functions (path, ...)
+import os
+# thread safe trigger (signal handler, http endpoint)
+import threading
+from contextlib import contextmanager, nullcontext
+# logging
+import logging
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+DEFAULT_PROFILE_CYCLES = 3
+TOP_STATS_COUNT = 40
+TOP_MEMORY_COUNT = 20
+_NULL_CONTEXT = nullcontext()
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: CycleProfiler
+#****************************************
+class CycleProfiler():
+    """Profile the next N update cycles on request (signal, CLI flag, http endpoint).
+
+    cycle() and channel() return a shared no-op context manager while no profiling is requested, so an inactive profiler costs one
+    attribute check per cycle/channel. Work of executor threads (Telegram requests of the async scanner path) is profiled, if it
+    is started by run_in_worker(). A profiled cycle writes into output_dir:
+    - cycle_<time>.prof: cProfile stats of main and worker threads (load with pstats or snakeviz)
+    - cycle_<time>.txt: top functions (cumulative time), per channel breakdown and tracemalloc top allocations of the cycle
+    """
+
+    def __init__(self, output_dir:str="profiles") -> None:
+        self._output_dir = output_dir
+        self._lock = threading.Lock()
+        self._requested_cycles = 0
+        self._active = False
+        self._started_tracemalloc = False
+        self._worker_profiles = []
+
+    def request(self, cycles:int=DEFAULT_PROFILE_CYCLES) -> None:
+        """profile the next 'cycles' update cycles (thread safe, can be called from signal handler or http thread)"""
+
+        with self._lock:
+            self._requested_cycles = max(self._requested_cycles, cycles)
+        log.info(f"profiling of next {cycles} update cycles requested. Output: '{self._output_dir}'")
+
+    def cycle(self):
+        """context manager around one complete update cycle"""
+
+        if not self._requested_cycles:
+            return _NULL_CONTEXT
+        return self._profile_cycle()
+
+    def channel(self, channel_key:str):
+        """context manager around the processing of one raid channel (only measured inside a profiled cycle)"""
+
+        if not self._active:
+            return _NULL_CONTEXT
+        return self._measure_channel(channel_key)
+
+    def run_in_worker(self, func, *args):
+        """call func(*args) in an executor thread. Inside a profiled cycle the call is profiled and merged into the cycle report"""
+
+        if not self._active:
+            return func(*args)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # profiling tool is process wide (python >= 3.12) and already used by main thread -> worker not profiled
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            with self._lock:
+                self._worker_profiles.append(profile)
+
+    @contextmanager
+    def _profile_cycle(self):
+        self._channel_durations = []
+        self._worker_profiles = []
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        memory_start = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        self._active = True
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - start
+            self._active = False
+            memory_end = tracemalloc.take_snapshot()
+            with self._lock:
+                self._requested_cycles -= 1
+                remaining_cycles = self._requested_cycles
+            if remaining_cycles <= 0 and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            try:
+                self._write_report(profile, duration, memory_start, memory_end)
+            except OSError:
+                log.exception("can't write profiling report")
+
+    @contextmanager
+    def _measure_channel(self, channel_key:str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._channel_durations.append((channel_key, time.perf_counter() - start))
+
+    def _write_report(self, profile:cProfile.Profile, duration:float, memory_start:tracemalloc.Snapshot, memory_end:tracemalloc.Snapshot) -> None:
+        os.makedirs(self._output_dir, exist_ok=True)
+        basename = os.path.join(self._output_dir, f"cycle_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+        report = io.StringIO()
+        stats = pstats.Stats(profile, stream=report)
+        with self._lock:
+            worker_profiles = self._worker_profiles
+            self._worker_profiles = []
+        for worker_profile in worker_profiles:
+            stats.add(worker_profile)
+        stats.dump_stats(basename + ".prof")
+        report.write(f"update cycle duration: {duration:.3f}s\n")
+        report.write(f"profiled worker thread calls (merged): {len(worker_profiles)}\n\n")
+        report.write(self._format_channel_breakdown(self._channel_durations))
+        report.write("\n==== top functions (cumulative time, main and worker threads) ====\n")
+        stats.sort_stats("cumulative").print_stats(TOP_STATS_COUNT)
+        report.write("\n==== top memory allocations during cycle ====\n")
+        for stat in memory_end.compare_to(memory_start, "lineno")[:TOP_MEMORY_COUNT]:
+            report.write(f"{stat}\n")
+        with open(basename + ".txt", "w") as f:
+            f.write(report.getvalue())
+        log.info(f"profiling report written: {basename}.txt ({duration:.3f}s cycle)")
+
+    @staticmethod
+    def _format_channel_breakdown(channel_durations:List[Tuple[str, float]]) -> str:
+        """per channel durations, slowest first"""
+
+        total_by_channel = {}
+        for channel_key, channel_duration in channel_durations:
+            total_by_channel[channel_key] = total_by_channel.get(channel_key, 0) + channel_duration
+        lines = [f"==== raid channels ({len(total_by_channel)}, slowest first) ===="]
+        for channel_key, channel_duration in sorted(total_by_channel.items(), key=lambda item: item[1], reverse=True):
+            lines.append(f"{channel_key:30s} {channel_duration*1000:10.1f}ms")
+        return "\n".join(lines) + "\n"
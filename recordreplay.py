@@ -0,0 +1,276 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import Dict, Iterator, List, Tuple
+# time handling
+import time
+# compact record file: gzip compressed JSON lines
+import gzip
+import json
+import zlib
+# concurrent Telegram requests (executor threads of async scanner path)
+import threading
+# close record file on shutdown
+import atexit
+# logging
+import logging
+# tg_raidbot modules
+from scannerconnector import DEFAULT_FETCH_BATCH_SIZE, Raid, ScannerConnector
+from simpletelegramapi import DEFAULT_TIMEOUT_IN_S, SimpleTelegramApi
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+RECORD_VERSION = 1
+
+'''
+****************************************
+* Module functions
+****************************************
+'''
+def create_query_key(raidlevel_list:List[int], unknown_raids:bool, geofence_index:int, order_time_reverse:bool, geofence_gym_ids:bool) -> str:
+    """key of a scanner query in record file (geofences are stored once and referenced by index)"""
+    return json.dumps([list(raidlevel_list), bool(unknown_raids), geofence_index, bool(order_time_reverse), bool(geofence_gym_ids)])
+
+def read_record_file(filepath:str) -> Iterator[Dict]:
+    """yield all entries of a record file. A truncated end (e.g. bot was killed during recording) is ignored
+
+    Raises:
+        KeyError: record file can't be read (missing, no gzip file, no permission, ...)
+    """
+
+    try:
+        with gzip.open(filepath, "rt", encoding="utf8") as f:
+            try:
+                for line in f:
+                    yield json.loads(line)
+            except (EOFError, zlib.error, ValueError):
+                log.warning(f"record file '{filepath}' is truncated -> replay recorded cycles until truncation")
+    except FileNotFoundError:
+        log.error(f"Can't find record file '{filepath}'. Check, if file exists")
+        raise KeyError
+    except OSError as e:
+        log.error(f"Can't read record file '{filepath}': {e}")
+        raise KeyError
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: CycleRecorder
+#****************************************
+class CycleRecorder():
+    """Write scanner rows and Telegram responses of every update cycle into a gzip compressed JSON lines file.
+
+    Entries:
+    - {"t": "header", ...}: version, resolved raid channel configuration and translations (replay works offline)
+    - {"t": "geofence", "i": index, "g": geofence}: geofence string, written once
+    - {"t": "cycle", "ts": time, "channels": [channel keys]}: start of update cycle
+    - {"t": "rows", "q": query key, "r": [raid rows]}: result of one scanner query
+    - {"t": "tg", "m": method, "r": response text, "d": duration}: one Telegram request
+    """
+
+    def __init__(self, filepath:str) -> None:
+        self._filepath = filepath
+        self._file = gzip.open(filepath, "wt", encoding="utf8", compresslevel=6)
+        self._lock = threading.Lock()
+        self._geofence_index_dict = {}
+        self.cycle_count = 0
+        # complete gzip stream also on CTRL+c / sys.exit(), otherwise the last cycle is lost
+        atexit.register(self.close)
+        log.info(f"recording update cycles into '{filepath}'")
+
+    def _write(self, entry:Dict) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def write_header(self, raidconfig_list:List[Dict], translations:Dict) -> None:
+        self._write({"t": "header", "version": RECORD_VERSION, "raidconfig_list": raidconfig_list, "translations": translations})
+
+    def start_cycle(self, channel_key_list:List[str]) -> None:
+        """mark start of update cycle. Data of previous cycle is flushed (readable even if bot is killed later)"""
+
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+        self.cycle_count += 1
+        self._write({"t": "cycle", "ts": time.time(), "channels": channel_key_list})
+
+    def record_rows(self, raidlevel_list:List[int], unknown_raids:bool, geofence:str, order_time_reverse:bool, geofence_gym_ids:bool, raid_list:List[Raid]) -> None:
+        geofence_index = self._geofence_index_dict.get(geofence)
+        if geofence_index is None:
+            geofence_index = len(self._geofence_index_dict)
+            self._geofence_index_dict[geofence] = geofence_index
+            self._write({"t": "geofence", "i": geofence_index, "g": geofence})
+        query_key = create_query_key(raidlevel_list, unknown_raids, geofence_index, order_time_reverse, geofence_gym_ids)
+        self._write({"t": "rows", "q": query_key, "r": [list(raid) for raid in raid_list]})
+
+    def record_telegram(self, method:str, response:str, duration:float) -> None:
+        self._write({"t": "tg", "m": method, "r": response, "d": round(duration, 4)})
+
+    def close(self) -> None:
+        """finish record file (can be called several times)"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                log.info(f"record file '{self._filepath}' closed ({self.cycle_count} cycles)")
+
+#****************************************
+# Class: RecordingScannerConnector
+#****************************************
+class RecordingScannerConnector(ScannerConnector):
+    """Scanner connector wrapper: raids are read completely (no streaming) and recorded before they are returned"""
+
+    def __init__(self, scannerconnector:ScannerConnector, recorder:CycleRecorder) -> None:
+        self._scannerconnector = scannerconnector
+        self._recorder = recorder
+
+    def iter_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False, batch_size:int=DEFAULT_FETCH_BATCH_SIZE) -> Iterator[Raid]:
+        raid_list = self._scannerconnector.get_raids(raidlevel_list, unknown_raids, geofence, order_time_reverse, geofence_gym_ids)
+        self._recorder.record_rows(raidlevel_list, unknown_raids, geofence, order_time_reverse, geofence_gym_ids, raid_list)
+        return (raid for raid in raid_list)
+
+    def get_warm_state(self) -> Dict:
+        return self._scannerconnector.get_warm_state()
+
+    def restore_warm_state(self, state:Dict) -> None:
+        self._scannerconnector.restore_warm_state(state)
+
+class AsyncRecordingScannerConnector(RecordingScannerConnector):
+    """same as RecordingScannerConnector for async scanner connectors"""
+    is_async = True
+
+    async def get_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False) -> List[Raid]:
+        raid_list = await self._scannerconnector.get_raids(raidlevel_list, unknown_raids, geofence, order_time_reverse, geofence_gym_ids)
+        self._recorder.record_rows(raidlevel_list, unknown_raids, geofence, order_time_reverse, geofence_gym_ids, raid_list)
+        return raid_list
+
+def create_recording_scannerconnector(scannerconnector:ScannerConnector, recorder:CycleRecorder) -> RecordingScannerConnector:
+    if scannerconnector.is_async:
+        return AsyncRecordingScannerConnector(scannerconnector, recorder)
+    return RecordingScannerConnector(scannerconnector, recorder)
+
+#****************************************
+# Class: RecordingTelegramApi
+#****************************************
+class RecordingTelegramApi(SimpleTelegramApi):
+    """SimpleTelegramApi, which records every response"""
+
+    def __init__(self, api_token:str, recorder:CycleRecorder, api_url:str="https://api.telegram.org", timeout_in_s:float=DEFAULT_TIMEOUT_IN_S) -> None:
+        super().__init__(api_token, api_url, timeout_in_s)
+        self._recorder = recorder
+
+    def _send_request(self, command:str) -> str:
+        start = time.perf_counter()
+        response = super()._send_request(command)
+        self._recorder.record_telegram(command.split("?", 1)[0], response, time.perf_counter() - start)
+        return response
+
+#****************************************
+# Class: ReplayScannerConnector
+#****************************************
+class ReplayScannerConnector(ScannerConnector):
+    """Scanner connector, which returns the recorded rows of the actual replay cycle (see load_cycle())"""
+
+    def __init__(self, latency_in_s:float=0.0) -> None:
+        self._latency_in_s = latency_in_s
+        self._geofence_index_dict = {}
+        self._rows_dict = {}
+        self.missing_query_count = 0
+
+    def add_geofence(self, geofence_index:int, geofence:str) -> None:
+        self._geofence_index_dict[geofence] = geofence_index
+
+    def load_cycle(self, rows_dict:Dict[str, List[list]]) -> None:
+        """use recorded rows of one cycle: query key -> rows"""
+        self._rows_dict = rows_dict
+
+    def iter_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False, batch_size:int=DEFAULT_FETCH_BATCH_SIZE) -> Iterator[Raid]:
+        if self._latency_in_s:
+            time.sleep(self._latency_in_s)
+        query_key = create_query_key(raidlevel_list, unknown_raids, self._geofence_index_dict.get(geofence, -1), order_time_reverse, geofence_gym_ids)
+        rows = self._rows_dict.get(query_key)
+        if rows is None:
+            # query wasn't recorded (e.g. changed query pattern of new version)
+            self.missing_query_count += 1
+            rows = []
+        return (Raid._make(row) for row in rows)
+
+#****************************************
+# Class: ReplayTelegramApi
+#****************************************
+class ReplayTelegramApi(SimpleTelegramApi):
+    """SimpleTelegramApi without network: returns the recorded responses of the actual replay cycle per method (in recorded order).
+    Requests without recorded response (e.g. new version sends more requests) get a generic ok response"""
+
+    def __init__(self, latency_in_s:float=None) -> None:
+        super().__init__("replay", "http://replay.invalid")
+        # None: use recorded latency of every response
+        self._latency_in_s = latency_in_s
+        self._response_dict = {}
+        self._lock = threading.Lock()
+        self._next_message_id = 10**9
+        self.request_count = {}
+
+    def load_cycle(self, response_dict:Dict[str, List[Tuple[str, float]]]) -> None:
+        """use recorded responses of one cycle: method -> [(response text, duration), ...]"""
+        with self._lock:
+            self._response_dict = {method: list(reversed(response_list)) for method, response_list in response_dict.items()}
+
+    def _send_request(self, command:str) -> str:
+        method = command.split("?", 1)[0]
+        with self._lock:
+            self.request_count[method] = self.request_count.get(method, 0) + 1
+            response_list = self._response_dict.get(method)
+            if response_list:
+                response, duration = response_list.pop()
+            else:
+                self._next_message_id += 1
+                response, duration = json.dumps({"ok": True, "result": {"message_id": self._next_message_id} if method == "sendMessage" else True}), 0.0
+        latency_in_s = duration if self._latency_in_s is None else self._latency_in_s
+        if latency_in_s:
+            time.sleep(latency_in_s)
+        return response
+
+#****************************************
+# Class: RecordReader
+#****************************************
+class RecordReader():
+    """read record file and provide header and per cycle data for replay"""
+
+    def __init__(self, filepath:str) -> None:
+        self.header = None
+        self.geofence_list = []
+        # [(cycle timestamp, channel key list, rows dict, telegram response dict), ...]
+        self.cycle_list = []
+        for entry in read_record_file(filepath):
+            entry_type = entry["t"]
+            if entry_type == "header":
+                if entry.get("version") != RECORD_VERSION:
+                    log.error(f"record file '{filepath}' has incompatible version")
+                    raise KeyError
+                self.header = entry
+            elif entry_type == "geofence":
+                self.geofence_list.append((entry["i"], entry["g"]))
+            elif entry_type == "cycle":
+                self.cycle_list.append((entry["ts"], entry["channels"], {}, {}))
+            elif entry_type == "rows" and self.cycle_list:
+                self.cycle_list[-1][2][entry["q"]] = entry["r"]
+            elif entry_type == "tg" and self.cycle_list:
+                self.cycle_list[-1][3].setdefault(entry["m"], []).append((entry["r"], entry["d"]))
+        if self.header is None:
+            log.error(f"record file '{filepath}' has no header")
+            raise KeyError
@@ -12,6 +12,8 @@ import logging
 from logging.handlers import RotatingFileHandler
 
 from tg_raidbot import TelegramRaidbot
+from profiler import DEFAULT_PROFILE_CYCLES
+import metrics
 
 '''
 ****************************************
@@ -59,7 +61,17 @@ def config_logging(logger, console_loglevel = logging.INFO, file_loglevel = None
         file_handler.setLevel(file_loglevel)
         file_handler.setFormatter(formatter_file)
         logger.addHandler(file_handler)
-    logger.setLevel(logging.DEBUG)
+    # root logger level = lowest handler level. Records below are dropped before they are created.
+    handler_loglevels = [logging.getLevelName(console_loglevel), logging.ERROR]
+    if file_loglevel is not None:
+        handler_loglevels.append(logging.getLevelName(file_loglevel))
+    logger.setLevel(min(handler_loglevels))
+
+def start_profile(telegramRaidbot, params):
+    """metrics endpoint action '/profile?cycles=N': profile next N update cycles"""
+    cycles = int(params.get("cycles", DEFAULT_PROFILE_CYCLES))
+    telegramRaidbot.request_profile(cycles)
+    return f"profiling of next {cycles} update cycles started\n"
 
 def is_valid_loglevel(loglevel):
     return any(loglevel in sub for sub in VALID_LOGLEVEL)
@@ -68,6 +80,14 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-lc', '--log-level-console', default='INFO', choices=VALID_LOGLEVEL, required=False, help='set log level for console. Default:INFO')
     parser.add_argument('-lf', '--log-level-file', default='NONE', choices=VALID_LOGLEVEL_FILE, required=False, help='set log level for logfile. Default:NONE')
+    parser.add_argument('-mp', '--metrics-port', default=0, type=int, required=False, help='start prometheus metrics endpoint on this port (0: disabled). Default:0')
+    parser.add_argument('-mh', '--metrics-host', default='127.0.0.1', required=False, help='bind address of metrics endpoint. Default:127.0.0.1')
+    parser.add_argument('-pc', '--profile-cycles', default=0, type=int, required=False, help='profile the first N update cycles (cProfile + tracemalloc report). Default:0')
+    parser.add_argument('-pd', '--profile-dir', default='profiles', required=False, help='output directory of profiling reports. Default:profiles')
+    parser.add_argument('--record', default=None, required=False, help='record scanner rows and Telegram responses of all update cycles into this file (gzip)')
+    parser.add_argument('--replay', default=None, required=False, help='replay update cycles of a record file offline (no scanner/Telegram access) and exit')
+    parser.add_argument('--replay-speed', default=0, type=float, required=False, help='time scale of replay (e.g. 10: ten times faster than recorded, 0: as fast as possible). Default:0')
+    parser.add_argument('--replay-latency-ms', default=None, type=float, required=False, help='fake latency of every scanner query and Telegram request during replay. Default: recorded Telegram latency')
     args = parser.parse_args()
     file_loglevel = args.log_level_file
     console_loglevel = args.log_level_console
@@ -80,12 +100,36 @@ def main():
     try:
         log.info(f"Start TelegramRaidbot...")
         telegramRaidbot = TelegramRaidbot()
+        telegramRaidbot.set_profile_dir(args.profile_dir)
+        if args.record:
+            telegramRaidbot.start_recording(args.record)
+        if args.profile_cycles > 0:
+            telegramRaidbot.request_profile(args.profile_cycles)
         #@TODO: add additional startup functions
+    except OSError as e:
+        log.error(f"Can't create record file '{args.record}': {e}")
+        return
     except Exception:
         log.error(f"Error in startup of TelegramRaidbot (__init__). Check configuration.")
         log.exception("Exception info:")
-    else:
-        telegramRaidbot.run()
+        return
+
+    if args.metrics_port != 0:
+        try:
+            metrics.start_http_server(args.metrics_port, args.metrics_host, actions={"/profile": lambda params: start_profile(telegramRaidbot, params)})
+        except OSError:
+            log.exception(f"Can't start metrics endpoint on {args.metrics_host}:{args.metrics_port}")
+
+    if args.replay:
+        latency_in_s = None if args.replay_latency_ms is None else args.replay_latency_ms / 1000
+        try:
+            result = telegramRaidbot.replay(args.replay, speed=args.replay_speed, latency_in_s=latency_in_s)
+        except KeyError:
+            log.error(f"Replay of '{args.replay}' failed. Check configuration and record file.")
+            return
+        print(f"replayed {result['cycles']} cycles in {result['duration_s']:.2f}s ({result['cycles_per_s']:.2f} cycles/s), telegram requests: {result['telegram_requests']}, missing scanner queries: {result['missing_queries']}")
+        return
+    telegramRaidbot.run()
 
 '''
 ****************************************
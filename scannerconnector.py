@@ -6,12 +6,21 @@
 * Import
 ****************************************
 '''
-from typing import Dict, List
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+# time handling
+import time
+# json file scanner source
+import json
+# in-memory raid store can be updated from other threads (webhook receiver)
+import threading
 # MYSQL database connection
 import mysql.connector
 from mysql.connector import Error
 # logging
 import logging
+# tg_raidbot modules
+import metrics
+from logutils import LogSampler, log_payload
 
 '''
 ****************************************
@@ -19,6 +28,70 @@ import logging
 ****************************************
 '''
 log = logging.getLogger(__name__)
+_result_log_sampler = LogSampler(every_n=10)
+DEFAULT_FETCH_BATCH_SIZE = 100
+# [db] type -> scanner connector class, see register_scannerconnector()
+SCANNER_CONNECTORS = {}
+
+'''
+****************************************
+* Module functions
+****************************************
+'''
+def parse_geofence(geofence:str) -> List[Tuple[float, float]]:
+    """parse geofence string 'lat_1 lon_1, lat_2 lon_2, ...' into list of (lat, lon) tuples"""
+    return [tuple(float(value) for value in coords.split()) for coords in geofence.split(",")]
+
+def get_geofence_bbox(geofence:str) -> Tuple[float, float, float, float]:
+    """return bounding box (min_lat, max_lat, min_lon, max_lon) of geofence string"""
+    polygon = parse_geofence(geofence)
+    lat_list = [coords[0] for coords in polygon]
+    lon_list = [coords[1] for coords in polygon]
+    return (min(lat_list), max(lat_list), min(lon_list), max(lon_list))
+
+def is_valid_geofence(geofence:str) -> bool:
+    """check geofence string: at least 3 'lat lon' pairs of valid coordinates"""
+    try:
+        polygon = parse_geofence(geofence)
+    except ValueError:
+        return False
+    return len(polygon) >= 3 and all(len(coords) == 2 and -90 <= coords[0] <= 90 and -180 <= coords[1] <= 180 for coords in polygon)
+
+def is_in_polygon(lat:float, lon:float, polygon:List[Tuple[float, float]]) -> bool:
+    """ray casting point in polygon check"""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lon_i = polygon[i]
+        lat_j, lon_j = polygon[j]
+        if (lon_i > lon) != (lon_j > lon) and lat < (lat_j - lat_i) * (lon - lon_i) / (lon_j - lon_i) + lat_i:
+            inside = not inside
+        j = i
+    return inside
+
+def register_scannerconnector(db_type:str):
+    """class decorator: register scanner connector class for [db] type"""
+    def decorator(connector_class):
+        SCANNER_CONNECTORS[db_type] = connector_class
+        return connector_class
+    return decorator
+
+def create_scannerconnector(cfg) -> "ScannerConnector":
+    """create scanner connector for [db] type (and async_queries) configuration
+
+    Raises:
+        KeyError: unknown [db] type or missing configuration parameter
+    """
+    if cfg.db_async_queries:
+        # registers async scanner connectors (imported only on demand: aiomysql/asyncio aren't needed otherwise)
+        import asyncscannerconnector
+        db_type = f"{cfg.db_type}_async"
+    else:
+        db_type = cfg.db_type
+    if db_type not in SCANNER_CONNECTORS:
+        log.error(f"[db] parameter issue: type '{db_type}' not supported. Available types: {', '.join(SCANNER_CONNECTORS.keys())}")
+        raise KeyError
+    return SCANNER_CONNECTORS[db_type].from_cfg(cfg)
 
 '''
 ****************************************
@@ -26,12 +99,67 @@ log = logging.getLogger(__name__)
 ****************************************
 '''
 
+#****************************************
+# Class: Raid
+#****************************************
+class Raid(NamedTuple):
+    """Compact (tuple based, no per instance __dict__) active raid record. Field order = column order of raid queries"""
+    gym_name: str
+    raid_level: int
+    raid_pokemon_id: int
+    raid_battle_timestamp: int
+    raid_end_timestamp: int
+    atk_fast: int
+    atk_charge: int
+    lat: float
+    lon: float
+
+#****************************************
+# Class: ScannerConnector
+#****************************************
+class ScannerConnector():
+    """Interface of all scanner backends. Backends are registered with @register_scannerconnector('<[db] type>')"""
+    is_async = False
+
+    @classmethod
+    def from_cfg(cls, cfg) -> "ScannerConnector":
+        """create connector from Cfg object"""
+        raise NotImplementedError
+
+    def get_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False) -> List[Raid]:
+        """Return active raids from scanner according provided filter. If you don't want to filter raids by geofence, set geofence = ''.
+        With geofence_gym_ids = True, geofence is checked by a cached gym id list instead of a spatial query (recommended for small geofences)"""
+
+        return list(self.iter_raids(raidlevel_list, unknown_raids, geofence, order_time_reverse, geofence_gym_ids))
+
+    def iter_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False, batch_size:int=DEFAULT_FETCH_BATCH_SIZE) -> Iterator[Raid]:
+        """Same as get_raids(), but yield raids while they are fetched from scanner"""
+        raise NotImplementedError
+
+    def get_all_raids(self, raidlevel_list:List[int]) -> Optional[List[Raid]]:
+        """Return all active raids of the raid levels (no geofence). Unlike get_raids(), None is returned if the scanner query failed"""
+
+        return self.get_raids(raidlevel_list)
+
+    def get_warm_state(self) -> Dict:
+        """return JSON serializable cache state, which should survive a restart (see restore_warm_state())"""
+        return {}
+
+    def restore_warm_state(self, state:Dict) -> None:
+        """restore cache state created by get_warm_state()"""
+        pass
+
 #****************************************
 # Class: DbConnector
 #****************************************
 class DbConnector():
-    def __init__(self, host:str, db_name:str, username:str, password:str, port:int=3306) -> None:
+    def __init__(self, host:str, db_name:str, username:str, password:str, port:int=3306, timeout_in_s:int=30) -> None:
         self._db_connection = None
+        # last connect or query failed or connection was lost -> next connect is counted as reconnect
+        self._connection_failed = False
+        # session statement, which limits query execution time (None: not detected yet, "": not supported by database)
+        self._query_timeout_statement = None
+        self._timeout_in_s = timeout_in_s
         self._host = host
         self._port = port
         self._db_name = db_name
@@ -45,6 +173,9 @@ class DbConnector():
     def _connect(self) -> None:
         """Connect to database, if not already connected"""
         try:
+            if self._db_connection is not None and not self._db_connection.is_connected():
+                # connection lost (server restart, wait_timeout, ...)
+                self._connection_failed = True
             # only create new connection, if not already a connection is available
             if self._db_connection is None or not self._db_connection.is_connected():
                 self._db_connection = mysql.connector.connect(
@@ -52,78 +183,369 @@ class DbConnector():
                     port = self._port,
                     user = self._username,
                     passwd = self._password,
-                    database = self._db_name
+                    database = self._db_name,
+                    connection_timeout = self._timeout_in_s
                 )
+                self._set_query_timeout(self._db_connection)
+                if self._connection_failed:
+                    # planned connects (disconnect after every query) aren't counted
+                    metrics.db_reconnects_total.inc()
+                    self._connection_failed = False
                 log.debug(f"DbConnector: SQL db connected successfully")
         except Error as e:
+            self._connection_failed = True
             log.error("DbConnector: SQL connection error.")
             log.exception("Exception info:")
         return self._db_connection
 
+    def _set_query_timeout(self, connection) -> None:
+        """limit query execution time of session to timeout_in_s (MySQL: max_execution_time in ms, MariaDB: max_statement_time in s)"""
+
+        if self._query_timeout_statement is None:
+            statement_list = [f"SET SESSION max_execution_time = {int(self._timeout_in_s * 1000)}", f"SET SESSION max_statement_time = {self._timeout_in_s}"]
+        else:
+            statement_list = [self._query_timeout_statement] if self._query_timeout_statement else []
+        for statement in statement_list:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(statement)
+                self._query_timeout_statement = statement
+                return
+            except Error:
+                pass
+            finally:
+                cursor.close()
+        if self._query_timeout_statement is None and connection.is_connected():
+            log.warning("DbConnector: database supports no query timeout -> scanner queries are not limited by [db] timeout_in_s")
+            self._query_timeout_statement = ""
+
     def _disconnect(self) -> None:
         """Disconnect a open database connection"""
         if self._db_connection is not None:
             log.debug("DbConnector: disconnect")
             self._db_connection.close()
+            self._db_connection = None
+
+    def execute_query(self, query:str, commit:bool=False, disconnect:bool=True, query_name:str="", row_type:NamedTuple=None) -> List:
+        """Execute a SQL query including connect and disconnect. query_name is used as metrics label.
 
-    def execute_query(self, query:str, commit:bool=False, disconnect:bool=True) -> List[Dict]:
-        """Execute a SQL query including connect and disconnect"""
+        Without row_type, every row is returned as dict. With row_type, a tuple cursor is used and every row is
+        streamed directly from the connection into a row_type record (no intermediate dict or row list).
+        """
         result = None
         try:
             connection = self._connect()
-            cursor = connection.cursor(dictionary=True)
-            log.debug(f"DbConnector: SQL query '{query}'...")
-            cursor.execute(query)
-            if commit:
-                result = connection.commit()
-            else:
-                result = cursor.fetchall()
+            if connection is None:
+                return None
+            cursor = connection.cursor(dictionary=(row_type is None))
+            log.debug("DbConnector: SQL query '%s'...", query)
+            with metrics.db_query_seconds.time(query=query_name):
+                cursor.execute(query)
+                if commit:
+                    result = connection.commit()
+                elif row_type is not None:
+                    result = [row_type._make(row) for row in cursor]
+                else:
+                    result = cursor.fetchall()
             if disconnect:
                 self._disconnect()
             cursor.close()
-            log.debug(f"DbConnector: SQL query successfully executed")
-            log.debug(f"DbConnector: SQL query result: {result}")
+            log.debug("DbConnector: SQL query successfully executed")
+            log_payload(log, "DbConnector: SQL query result (sampled): %s", result, sampler=_result_log_sampler)
         except Error as e:
             log.error("DbConnector: SQL query error.")
             log.exception("Exception info:")
+            self._connection_failed = True
             self._disconnect()
             return None
 
         return result
 
+    def iter_query(self, query:str, row_type:NamedTuple, batch_size:int=DEFAULT_FETCH_BATCH_SIZE, disconnect:bool=True, query_name:str="") -> Iterator:
+        """Execute a SQL query and yield every row as row_type record. Rows are fetched in fetchmany(batch_size) batches.
+
+        Consumer can stop iteration at any time: close() the generator (or use contextlib.closing) to release cursor and connection.
+        SQL errors are logged and end the iteration. db_query_seconds covers execute and all fetchmany() batches, but not the
+        time the consumer spends between batches.
+        """
+        connection = None
+        cursor = None
+        exhausted = False
+        query_seconds = None
+        try:
+            connection = self._connect()
+            if connection is None:
+                return
+            cursor = connection.cursor()
+            log.debug("DbConnector: SQL query '%s'...", query)
+            start = time.perf_counter()
+            query_seconds = 0.0
+            cursor.execute(query)
+            rows = cursor.fetchmany(batch_size)
+            query_seconds += time.perf_counter() - start
+            row_count = 0
+            while rows:
+                for row in rows:
+                    yield row_type._make(row)
+                row_count += len(rows)
+                start = time.perf_counter()
+                rows = cursor.fetchmany(batch_size)
+                query_seconds += time.perf_counter() - start
+            exhausted = True
+            log.debug("DbConnector: SQL query successfully executed (%d rows)", row_count)
+        except Error as e:
+            log.error("DbConnector: SQL query error.")
+            log.exception("Exception info:")
+            self._connection_failed = True
+        finally:
+            if query_seconds is not None:
+                # one observation per query (exhausted, closed early or failed)
+                metrics.db_query_seconds.observe(query_seconds, query=query_name)
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except Error:
+                    # unread rows left, because consumer stopped early. Connection is closed below.
+                    pass
+            if connection is not None and (disconnect or not exhausted):
+                self._disconnect()
+
+#****************************************
+# Class: RdmQueryBuilder
+#****************************************
+class RdmQueryBuilder():
+    """SQL query creation for RDM schema including geofence filter and gym id list caches. Shared by sync and async RDM connector"""
+    _gym_table = "gym"
+    _gym_id_column = "id"
+    _lat_column = "lat"
+    _lon_column = "lon"
+
+    def __init__(self, gym_id_cache_refresh_cycle_in_s:int=6*3600) -> None:
+        self._gym_id_cache_refresh_cycle_in_s = gym_id_cache_refresh_cycle_in_s
+        # geofence string -> SQL geofence filter / (update time, gym id list)
+        self._geofence_sql_cache = {}
+        self._gym_id_cache = {}
+
+    def _get_sql_geofence(self, geofence:str) -> str:
+        """Return SQL filter for geofence: index friendly lat/lon bounding box prefilter followed by exact polygon check"""
+
+        sql_geofence = self._geofence_sql_cache.get(geofence)
+        if sql_geofence is None:
+            min_lat, max_lat, min_lon, max_lon = get_geofence_bbox(geofence)
+            lat = self._lat_column
+            lon = self._lon_column
+            sql_geofence = f"AND {lat} BETWEEN {min_lat} AND {max_lat} AND {lon} BETWEEN {min_lon} AND {max_lon} AND ST_CONTAINS(st_geomfromtext('POLYGON(({geofence}))') , point({lat},{lon}))"
+            self._geofence_sql_cache[geofence] = sql_geofence
+        return sql_geofence
+
+    def _create_gym_ids_query(self, geofence:str) -> str:
+        return f"SELECT {self._gym_id_column} AS id FROM {self._gym_table} WHERE 1 {self._get_sql_geofence(geofence)};"
+
+    def _is_gym_id_cache_outdated(self, geofence:str) -> bool:
+        cache_entry = self._gym_id_cache.get(geofence)
+        return cache_entry is None or (time.time() - cache_entry[0]) > self._gym_id_cache_refresh_cycle_in_s
+
+    def _update_gym_id_cache(self, geofence:str, gym_id_list:List[str]) -> None:
+        """store gym id list of geofence. gym_id_list = None: query failed -> keep outdated list"""
+
+        if gym_id_list is None:
+            log.warning("RdmConnector: gym id list update failed. Use outdated gym id list (if available)")
+        else:
+            self._gym_id_cache[geofence] = (time.time(), gym_id_list)
+            log.debug("RdmConnector: %d gym ids cached for geofence", len(gym_id_list))
+
+    def _get_sql_gym_ids(self, geofence:str) -> str:
+        """Return SQL filter with cached list of all gym ids inside geofence. Fallback to geofence filter, if no gym id list is available"""
+
+        cache_entry = self._gym_id_cache.get(geofence)
+        if cache_entry is None:
+            return self._get_sql_geofence(geofence)
+        gym_id_list = cache_entry[1]
+        if not gym_id_list:
+            return "AND FALSE"
+        gym_id_str = ",".join("'" + str(gym_id).replace("'", "''") + "'" for gym_id in gym_id_list)
+        return f"AND {self._gym_id_column} IN ({gym_id_str})"
+
+    def get_warm_state(self) -> Dict:
+        """gym id lists incl. update time -> restored lists are refreshed according gym_id_cache_refresh_cycle"""
+        return {"gym_id_cache": [[geofence, update_time, gym_id_list] for geofence, (update_time, gym_id_list) in self._gym_id_cache.items()]}
+
+    def restore_warm_state(self, state:Dict) -> None:
+        for geofence, update_time, gym_id_list in state.get("gym_id_cache", []):
+            self._gym_id_cache[geofence] = (update_time, gym_id_list)
+        log.debug("RdmConnector: %d gym id lists restored", len(self._gym_id_cache))
+
+    def _create_raids_query(self, raidlevel_list:List[int], unknown_raids:bool, geofence:str, order_time_reverse:bool, geofence_gym_ids:bool) -> str:
+        """Return raid query. Gym id cache need to be updated before, if geofence_gym_ids is used"""
+
+        sql_order = "DESC" if order_time_reverse else "ASC"
+        if geofence == "":
+            sql_geofence = ""
+        elif geofence_gym_ids:
+            sql_geofence = self._get_sql_gym_ids(geofence)
+        else:
+            sql_geofence = self._get_sql_geofence(geofence)
+        sql_unknown_raids = "" if unknown_raids else "AND raid_pokemon_id <> 0"
+        raidlevel_str = ','.join([str(raidlevel) for raidlevel in raidlevel_list])
+        return f"SELECT name AS gym_name, raid_level, raid_pokemon_id, raid_battle_timestamp, raid_end_timestamp, raid_pokemon_move_1 AS atk_fast, raid_pokemon_move_2 AS atk_charge, lat, lon FROM gym WHERE UNIX_TIMESTAMP() < raid_end_timestamp AND raid_level IN ({raidlevel_str}) {sql_geofence} {sql_unknown_raids} ORDER BY raid_end_timestamp {sql_order};"
+
 #****************************************
 # Class: RdmConnector
 #****************************************
-class RdmConnector():
-    def __init__(self, db_host:str, db_port:int, db_name:str, db_username:str, db_password:str) -> None:
-        self._dbconnector = DbConnector(host=db_host, port=db_port, db_name=db_name, username=db_username, password=db_password)
+@register_scannerconnector("rdm")
+@register_scannerconnector("golbat")
+class RdmConnector(RdmQueryBuilder, ScannerConnector):
+    """RDM scanner database. Golbat uses the same gym table schema"""
+
+    def __init__(self, db_host:str, db_port:int, db_name:str, db_username:str, db_password:str, gym_id_cache_refresh_cycle_in_s:int=6*3600, db_timeout_in_s:int=30) -> None:
+        super().__init__(gym_id_cache_refresh_cycle_in_s)
+        self._dbconnector = DbConnector(host=db_host, port=db_port, db_name=db_name, username=db_username, password=db_password, timeout_in_s=db_timeout_in_s)
+
+    @classmethod
+    def from_cfg(cls, cfg) -> "RdmConnector":
+        return cls(db_host=cfg.db_host, db_port=cfg.db_port, db_name=cfg.db_name, db_username=cfg.db_user, db_password=cfg.db_password, gym_id_cache_refresh_cycle_in_s=cfg.db_gym_id_cache_refresh_cycle_in_s, db_timeout_in_s=cfg.db_timeout_in_s)
 
     def __del__(self) -> None:
         del self._dbconnector
 
-    def get_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False) -> List[Dict]:
-        """Return active raids from scanner according provided filter. If you don't want to filter raids by geofence, set geofence = ''"""
+    def _refresh_gym_ids(self, geofence:str) -> None:
+        """update cached gym id list of geofence, if outdated"""
+
+        if self._is_gym_id_cache_outdated(geofence):
+            dbreturn = self._dbconnector.execute_query(self._create_gym_ids_query(geofence), query_name="get_gym_ids")
+            self._update_gym_id_cache(geofence, None if dbreturn is None else [row["id"] for row in dbreturn])
+
+    def iter_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False, batch_size:int=DEFAULT_FETCH_BATCH_SIZE) -> Iterator[Raid]:
+        """Same as get_raids(), but yield raids while they are fetched (fetchmany batches) from scanner database"""
+
+        if geofence != "" and geofence_gym_ids:
+            self._refresh_gym_ids(geofence)
+        sql_query = self._create_raids_query(raidlevel_list, unknown_raids, geofence, order_time_reverse, geofence_gym_ids)
+        return self._dbconnector.iter_query(sql_query, Raid, batch_size=batch_size, query_name="get_raids")
+
+    def get_all_raids(self, raidlevel_list:List[int]) -> Optional[List[Raid]]:
+        return self._dbconnector.execute_query(self._create_raids_query(raidlevel_list, True, "", False, False), query_name="get_all_raids", row_type=Raid)
+
+#****************************************
+# Class: MadConnector
+#****************************************
+@register_scannerconnector("mad")
+class MadConnector(RdmConnector):
+    """MAD scanner database: raid table joined with gym (coordinates) and gymdetails (name). MAD stores raid times as UTC datetime"""
+    _gym_table = "gym"
+    _gym_id_column = "gym.gym_id"
+    _lat_column = "gym.latitude"
+    _lon_column = "gym.longitude"
+
+    def _create_raids_query(self, raidlevel_list:List[int], unknown_raids:bool, geofence:str, order_time_reverse:bool, geofence_gym_ids:bool) -> str:
+        """Return raid query. Gym id cache need to be updated before, if geofence_gym_ids is used"""
 
         sql_order = "DESC" if order_time_reverse else "ASC"
-        sql_geofence = "" if geofence == "" else f"AND ST_CONTAINS(st_geomfromtext('POLYGON(({geofence}))') , point(lat,lon))"
-        sql_unknown_raids = "" if unknown_raids else "AND raid_pokemon_id <> 0"
+        if geofence == "":
+            sql_geofence = ""
+        elif geofence_gym_ids:
+            sql_geofence = self._get_sql_gym_ids(geofence)
+        else:
+            sql_geofence = self._get_sql_geofence(geofence)
+        sql_unknown_raids = "" if unknown_raids else "AND raid.pokemon_id IS NOT NULL AND raid.pokemon_id <> 0"
         raidlevel_str = ','.join([str(raidlevel) for raidlevel in raidlevel_list])
-        sql_query = f"SELECT name AS gym_name, raid_level, raid_pokemon_id, raid_battle_timestamp, raid_end_timestamp, raid_pokemon_move_1 AS atk_fast, raid_pokemon_move_2 AS atk_charge, lat, lon FROM gym WHERE UNIX_TIMESTAMP() < raid_end_timestamp AND raid_level IN ({raidlevel_str}) {sql_geofence} {sql_unknown_raids} ORDER BY raid_end_timestamp {sql_order};"
-        dbreturn = self._dbconnector.execute_query(sql_query)
-        return dbreturn
+        # compare raw UTC datetime columns (index friendly), convert to unix timestamps only for selected rows
+        return (
+            "SELECT gymdetails.name AS gym_name, raid.level AS raid_level, COALESCE(raid.pokemon_id, 0) AS raid_pokemon_id, "
+            "UNIX_TIMESTAMP(CONVERT_TZ(raid.start, '+00:00', @@session.time_zone)) AS raid_battle_timestamp, "
+            "UNIX_TIMESTAMP(CONVERT_TZ(raid.end, '+00:00', @@session.time_zone)) AS raid_end_timestamp, "
+            "COALESCE(raid.move_1, 0) AS atk_fast, COALESCE(raid.move_2, 0) AS atk_charge, gym.latitude AS lat, gym.longitude AS lon "
+            "FROM raid JOIN gym ON gym.gym_id = raid.gym_id LEFT JOIN gymdetails ON gymdetails.gym_id = raid.gym_id "
+            f"WHERE raid.end > UTC_TIMESTAMP() AND raid.level IN ({raidlevel_str}) {sql_geofence} {sql_unknown_raids} ORDER BY raid.end {sql_order};"
+        )
 
-'''
 #****************************************
-# Class: MadConnector
+# Class: MemoryConnector
 #****************************************
-class MadConnector():
-    def __init__(self, db_host, db_port, db_name, db_username, db_password):
-        self._dbconnector = DbConnector(host=db_host, port=db_port, db_name=db_name, username=db_username, password=db_password)
+@register_scannerconnector("memory")
+class MemoryConnector(ScannerConnector):
+    """In-memory raid source (gym key -> Raid), optionally loaded from a JSON file. For tests, benchmarks and webhook ingestion.
+    Raids can be updated from other threads.
 
-    def __del__(self):
-        del self._dbconnector
+    JSON file format: list of objects with all Raid fields + 'gym_id'
+    """
+
+    def __init__(self, json_filepath:str="") -> None:
+        self._lock = threading.Lock()
+        self._raid_dict = {}
+        # geofence string -> (polygon, bounding box)
+        self._geofence_cache = {}
+        if json_filepath != "":
+            self.load_json(json_filepath)
+
+    @classmethod
+    def from_cfg(cls, cfg) -> "MemoryConnector":
+        return cls(json_filepath=cfg.db_json_file)
+
+    def load_json(self, json_filepath:str) -> None:
+        """replace raids with raids from JSON file"""
+
+        try:
+            with open(json_filepath, "r") as f:
+                raid_list = json.load(f)
+            self.replace_raids({str(raid.pop("gym_id")): Raid(**raid) for raid in raid_list})
+            log.info(f"MemoryConnector: {len(self._raid_dict)} raids loaded from '{json_filepath}'")
+        except Exception:
+            log.exception(f"MemoryConnector: can't load raids from '{json_filepath}'")
+            raise KeyError
+
+    def replace_raids(self, raid_dict:Dict[str, Raid]) -> None:
+        """replace all raids by dict gym key -> Raid"""
+        raid_dict = dict(raid_dict)
+        with self._lock:
+            self._raid_dict = raid_dict
+
+    def upsert_raid(self, gym_key, raid:Raid) -> None:
+        """add or update raid of gym"""
+        with self._lock:
+            self._raid_dict[gym_key] = raid
+
+    def remove_expired_raids(self) -> None:
+        now = time.time()
+        with self._lock:
+            self._raid_dict = {gym_key: raid for gym_key, raid in self._raid_dict.items() if raid.raid_end_timestamp > now}
+
+    def get_raid_count(self) -> int:
+        return len(self._raid_dict)
+
+    def is_in_geofence(self, lat:float, lon:float, geofence:str) -> bool:
+        """check if coordinates are inside geofence string (geofence = '': always True)"""
+
+        if geofence == "":
+            return True
+        polygon, (min_lat, max_lat, min_lon, max_lon) = self._get_geofence(geofence)
+        return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon and is_in_polygon(lat, lon, polygon)
+
+    def _get_geofence(self, geofence:str) -> Tuple[List[Tuple[float, float]], Tuple[float, float, float, float]]:
+        cache_entry = self._geofence_cache.get(geofence)
+        if cache_entry is None:
+            cache_entry = (parse_geofence(geofence), get_geofence_bbox(geofence))
+            self._geofence_cache[geofence] = cache_entry
+        return cache_entry
+
+    def iter_raids(self, raidlevel_list:List[int], unknown_raids:bool = True, geofence:str = "", order_time_reverse:bool = False, geofence_gym_ids:bool = False, batch_size:int=DEFAULT_FETCH_BATCH_SIZE) -> Iterator[Raid]:
+        """Same as get_raids(). geofence_gym_ids has no effect (raids are always filtered in memory)"""
 
-    def get_raids(self, raidlevel_list, unknown_raids:bool = True, geofence: str = None):
-        #@TODO: add MAD support
-        pass;
-'''
\ No newline at end of file
+        with metrics.db_query_seconds.time(query="get_raids"):
+            now = time.time()
+            raidlevel_set = set(raidlevel_list)
+            with self._lock:
+                raid_list = list(self._raid_dict.values())
+            result = [
+                raid for raid in raid_list
+                if now < raid.raid_end_timestamp and raid.raid_level in raidlevel_set and (unknown_raids or raid.raid_pokemon_id != 0)
+            ]
+            if geofence != "":
+                polygon, (min_lat, max_lat, min_lon, max_lon) = self._get_geofence(geofence)
+                # cheap bounding box check first, exact polygon check only for remaining raids
+                result = [
+                    raid for raid in result
+                    if min_lat <= raid.lat <= max_lat and min_lon <= raid.lon <= max_lon and is_in_polygon(raid.lat, raid.lon, polygon)
+                ]
+            result.sort(key=lambda raid: raid.raid_end_timestamp, reverse=order_time_reverse)
+        yield from result
@@ -12,6 +12,8 @@ import urllib
 import requests
 # logging
 import logging
+# tg_raidbot modules
+import metrics
 
 '''
 ****************************************
@@ -20,6 +22,7 @@ import logging
 '''
 log = logging.getLogger(__name__)
 MAX_MSG_LEN = 3000
+DEFAULT_TIMEOUT_IN_S = 10
 
 '''
 ****************************************
@@ -27,19 +30,25 @@ MAX_MSG_LEN = 3000
 ****************************************
 '''
 class SimpleTelegramApi:
-    def __init__(self, api_token:str) -> None:
-        self._base_url = self._get_base_url(api_token)
+    def __init__(self, api_token:str, api_url:str="https://api.telegram.org", timeout_in_s:float=DEFAULT_TIMEOUT_IN_S) -> None:
+        self._base_url = self._get_base_url(api_token, api_url)
+        # connect/read timeout: a stalled Telegram API can't block the update cycle
+        self._timeout_in_s = timeout_in_s
 
-    def _get_base_url(self, api_token:str) -> str:
+    def _get_base_url(self, api_token:str, api_url:str) -> str:
         """get TG bot API base url including bot token"""
 
-        return "https://api.telegram.org/bot{}/".format(api_token)
+        return "{}/bot{}/".format(api_url.rstrip("/"), api_token)
 
     def _send_request(self, command:str) -> str:
         """send TG bot API https request and return https response"""
 
         request_url = self._base_url + command
-        response = requests.get(request_url)
+        method = command.split("?", 1)[0]
+        with metrics.telegram_request_seconds.time(method=method):
+            response = requests.get(request_url, timeout=self._timeout_in_s)
+        if response.status_code == 429:
+            metrics.telegram_ratelimit_total.inc(method=method)
         decoded_response = response.content.decode("utf8")
         return decoded_response
 
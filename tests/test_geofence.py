@@ -0,0 +1,49 @@
+import pytest
+
+from scannerconnector import get_geofence_bbox, is_in_polygon, is_valid_geofence, parse_geofence
+
+# U shaped (concave) geofence: notch between lat 1..3 and lon 1..2 is outside
+CONCAVE_GEOFENCE = "0 0, 0 3, 3 3, 3 2, 1 2, 1 1, 3 1, 3 0"
+TRIANGLE_GEOFENCE = "0 0, 0 2, 2 0"
+
+
+@pytest.mark.parametrize("lat, lon", [(2, 0.5), (2, 2.5), (0.5, 1.5)])
+def test_point_inside_concave_polygon(lat, lon):
+    assert is_in_polygon(lat, lon, parse_geofence(CONCAVE_GEOFENCE))
+
+
+@pytest.mark.parametrize("lat, lon", [(2, 1.5), (4, 1), (-1, 1), (1.5, 3.5)])
+def test_point_outside_concave_polygon(lat, lon):
+    assert not is_in_polygon(lat, lon, parse_geofence(CONCAVE_GEOFENCE))
+
+
+def test_geofence_bbox():
+    assert get_geofence_bbox(CONCAVE_GEOFENCE) == (0, 3, 0, 3)
+    assert get_geofence_bbox("48.1 11.5, 48.3 11.7, 48.2 11.4") == (48.1, 48.3, 11.4, 11.7)
+
+
+def test_point_on_bbox_edge_outside_polygon():
+    min_lat, max_lat, min_lon, max_lon = get_geofence_bbox(TRIANGLE_GEOFENCE)
+    lat, lon = max_lat, 1.5
+    # bounding box check is inclusive, exact polygon check decides
+    assert min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+    assert not is_in_polygon(lat, lon, parse_geofence(TRIANGLE_GEOFENCE))
+
+
+def test_valid_geofence():
+    assert is_valid_geofence(CONCAVE_GEOFENCE)
+    assert is_valid_geofence("-90 -180, 90 180, 0 0")
+
+
+@pytest.mark.parametrize("geofence", [
+    "",
+    "0 0, 1 1",
+    "0 0, 0 1, a b",
+    "0 0, 0 1, 1",
+    "0 0, 0 1, 1 1 1",
+    "0 0, 0 1, 91 0",
+    "0 0, 0 1, 0 -181",
+    "0 0; 0 1; 1 1",
+])
+def test_malformed_geofence(geofence):
+    assert not is_valid_geofence(geofence)
@@ -0,0 +1,75 @@
+import pytest
+
+from scannerconnector import MemoryConnector
+from webhookreceiver import WebhookReceiver, convert_raid_webhook, create_gym_key
+
+RAID_MESSAGE = {
+    "gym_name": "Fountain",
+    "level": 5,
+    "pokemon_id": 150,
+    "start": 1700000000,
+    "end": 1700002700,
+    "move_1": 234,
+    "move_2": 94,
+    "latitude": 48.137154,
+    "longitude": 11.576124,
+}
+# webhook field -> Raid field
+RAID_FIELDS = {"pokemon_id": "raid_pokemon_id", "move_1": "atk_fast", "move_2": "atk_charge"}
+
+
+@pytest.fixture
+def receiver():
+    received_list = []
+    receiver = WebhookReceiver(MemoryConnector(), received_list.extend, port=0)
+    receiver.received_list = received_list
+    yield receiver
+    # listener was never started -> only close socket
+    receiver._server.server_close()
+
+
+def test_convert_raid_webhook():
+    raid = convert_raid_webhook(RAID_MESSAGE)
+    assert raid.gym_name == "Fountain"
+    assert (raid.raid_level, raid.raid_pokemon_id, raid.atk_fast, raid.atk_charge) == (5, 150, 234, 94)
+    assert (raid.raid_battle_timestamp, raid.raid_end_timestamp) == (1700000000, 1700002700)
+    assert (raid.lat, raid.lon) == (48.137154, 11.576124)
+
+
+@pytest.mark.parametrize("field", ["pokemon_id", "move_1", "move_2"])
+def test_convert_raid_webhook_null_or_missing_field(field):
+    # raid eggs are sent without pokemon and moves (missing or null)
+    assert getattr(convert_raid_webhook({**RAID_MESSAGE, field: None}), RAID_FIELDS[field]) == 0
+    message = dict(RAID_MESSAGE)
+    del message[field]
+    assert getattr(convert_raid_webhook(message), RAID_FIELDS[field]) == 0
+
+
+def test_process_payload_stores_raids(receiver):
+    egg_message = {**RAID_MESSAGE, "pokemon_id": None, "move_1": None, "latitude": 48.1, "longitude": 11.5}
+    del egg_message["move_2"]
+    payload = [
+        {"type": "raid", "message": RAID_MESSAGE},
+        {"type": "raid", "message": egg_message},
+        {"type": "pokemon", "message": {}},
+    ]
+    assert receiver.process_payload(payload) == 2
+    assert [raid.raid_pokemon_id for raid in receiver.received_list] == [150, 0]
+    assert create_gym_key(48.1, 11.5) in receiver._raidstore._raid_dict
+
+
+def test_process_payload_single_event(receiver):
+    assert receiver.process_payload({"type": "raid", "message": RAID_MESSAGE}) == 1
+
+
+def test_process_payload_ignores_invalid_raids(receiver):
+    message = dict(RAID_MESSAGE)
+    del message["level"]
+    payload = [
+        {"type": "raid", "message": message},
+        {"type": "raid", "message": {**RAID_MESSAGE, "start": "soon"}},
+        {"type": "raid", "message": None},
+        "raid",
+    ]
+    assert receiver.process_payload(payload) == 0
+    assert receiver.received_list == []
@@ -6,31 +6,42 @@
 * Import
 ****************************************
 '''
-from typing import Dict, List
+from typing import Dict, Iterable, List, Tuple
 # time handling
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 # os functions (path, ...)
 import os
 # other
 from string import Template
-# .ini config parser and datacache
-try:
-    import tomllib
-except ModuleNotFoundError:
-    import tomli as tomllib
+from contextlib import closing, nullcontext
+# async scanner queries
+import asyncio
+# webhook triggered updates + background refreshes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# config reload by SIGHUP, profiling by SIGUSR1
+import signal
+# koji api
 import json
-# url handling for koji api
-import urllib
 import requests
+# message hashes
+import hashlib
 # logging
 import logging
 # tg_raidbot modules
 from pogodata import Pogodata
-from simpletelegramapi import SimpleTelegramApi
-from scannerconnector import RdmConnector
+from simpletelegramapi import SimpleTelegramApi, MAX_MSG_LEN
+from scannerconnector import MemoryConnector, Raid, create_scannerconnector, is_valid_geofence
+from webhookreceiver import WebhookReceiver, create_gym_key
 from msgidcache import MsgIdCache
+from timeformatter import TimestampFormatter
+from profiler import CycleProfiler, DEFAULT_PROFILE_CYCLES
+from recordreplay import CycleRecorder, RecordingTelegramApi, RecordReader, ReplayScannerConnector, ReplayTelegramApi, create_recording_scannerconnector
+from warmstate import WarmStateCache
 from cfg import Cfg
+import metrics
+from logutils import Truncated, log_payload
 
 '''
 ****************************************
@@ -38,6 +49,12 @@ from cfg import Cfg
 ****************************************
 '''
 log = logging.getLogger(__name__)
+# edit errors, which need a new raid message. All other errors are retried with backoff
+RECREATE_MSG_ERROR_DESCRIPTIONS = ("message to edit not found", "message can't be edited")
+MAX_BACKOFF_IN_S = 3600
+# pin errors, which won't go away by retrying (missing rights, chat or message not found)
+PERMANENT_PIN_ERROR_CODES = (400, 403)
+KOJI_REQUEST_TIMEOUT_IN_S = 30
 cfg = Cfg(os.path.dirname(__file__) + "/config.toml")
 
 '''
@@ -50,14 +67,26 @@ cfg = Cfg(os.path.dirname(__file__) + "/config.toml")
 #****************************************
 class RaidChannel():
     def __init__(self, raidconfig):
+        # raidconfig (geofence_koji already resolved) is kept to detect changes during config reload
+        self.raidconfig = raidconfig
         self.chat_id = raidconfig["chat_id"]
         self.message_thread_id = raidconfig["message_thread_id"]
         self.raidlevel_list = raidconfig["raidlevel_list"]
         self.eggs = raidconfig["eggs"]
         self.raidlevel_grouping = raidconfig["raidlevel_grouping"]
         self.geofence = raidconfig["geofence"]
+        self.geofence_gym_ids = raidconfig["geofence_gym_ids"]
         self.order_time_reverse = raidconfig["order_time_reverse"]
         self.pin_msg = raidconfig["pin_msg"]
+        # scheduling state: highest raid level and content change time of last message, deferred in last cycle
+        self.max_raid_level = 0
+        self.last_change_time = 0
+        self.last_content_hash = None
+        self.deferred = False
+
+    def is_high_priority(self) -> bool:
+        """new/deferred raid channels, channels with high level raids or recent changes. They are updated first and never deferred"""
+        return self.last_content_hash is None or self.deferred or self.max_raid_level >= cfg.priority_raidlevel or (time.time() - self.last_change_time) < cfg.priority_recent_change_in_s
 
 #****************************************
 # Class: TelegramRaidbot
@@ -67,94 +96,245 @@ class TelegramRaidbot():
         self.raidchannel_list = []
         self._msgidcache = MsgIdCache()
         self._koji_geofencelist = []
+        self._async_loop = None
+        self._reconcile_scannerconnector = None
+        # raid channels with pending webhook update, main loop wakeup
+        self._pending_raidchannel_set = set()
+        self._pending_lock = threading.Lock()
+        self._wakeup_event = threading.Event()
+        self._reload_requested = False
+        # reloaded configuration waiting for background downloads: (new cfg, changed parameter, pogodata future, koji future)
+        self._pending_reload = None
+        # warm start snapshot, network refreshes (Pogodata, Koji) in background
+        self._warmstatecache = WarmStateCache()
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="refresh")
+        self._pogodata_future = None
+        self._koji_future = None
+        # raid channel key -> [message_id, hash of last sent message text]
+        self._last_msg_hash_dict = {}
+        # raid channels waiting for a new message (sent at end of update cycle), raid channel key -> (retry time, failure count)
+        self._recreate_list = []
+        self._backoff_dict = {}
+        self._pin_failed_set = set()
+        # per update cycle: timestamp string cache, update time footer
+        self._time_formatter = TimestampFormatter()
+        self._footer_msg = ""
+        self._cycle_deadline = 0
+        # on demand profiling of update cycles
+        self._profiler = CycleProfiler()
+        # record scanner rows + Telegram responses of all cycles (see start_recording())
+        self._recorder = None
 
-    def _send_new_tg_msg(self, chat_id:str, msg:str, message_thread_id:int=0, pin_msg:bool=True) -> None:
+    def _send_new_tg_msg(self, chat_id:str, msg:str, message_thread_id:int=0) -> dict:
+        """send new message and return response (None on communication errors)"""
+        response = None
         try:
             if message_thread_id != 0:
                 response = self._tgapi.send_message_thread(chat_id=chat_id, text=msg, message_thread_id=message_thread_id)
             else:
                 response = self._tgapi.send_message(chat_id=chat_id, text=msg)
-            log.debug(f"send new msg, response:{response}")
-            if response["ok"]:
-                msg_id = response["result"]["message_id"]
-                self._msgidcache.set_message_id(chat_id, message_thread_id, msg_id)
-                if pin_msg:
-                    log.debug(f"pin new message...")
-                    result = self._tgapi.pin_message(chat_id = chat_id, message_id = msg_id)
-                    # delete pin info message below pinned status message
-                    log.debug(f"delete pin info message...")
-                    result = self._tgapi.delete_message(chat_id = chat_id, message_id = msg_id + 1)
+            log.debug("send new msg, response:%s", response)
         except Exception as e:
             log.exception(f"Exception '{type(e)}' in send_new_raid_msg()")
+        return response
+
+    def _pin_tg_msg(self, raidchannel:RaidChannel, message_id:int, delete_pin_notice:bool=False) -> None:
+        """pin message of raid channel, if it isn't already pinned (cached pin state)"""
+
+        channel_key = self._get_channel_key(raidchannel)
+        # pin requests have their own backoff, so a failed pin doesn't defer raid message edits
+        pin_key = channel_key + ":pin"
+        if self._msgidcache.get_pinned_message_id(raidchannel.chat_id, raidchannel.message_thread_id) == message_id or (channel_key, message_id) in self._pin_failed_set or self._is_backed_off(pin_key):
+            return
+        log.debug("pin message %s...", message_id)
+        try:
+            response = self._tgapi.pin_message(chat_id = raidchannel.chat_id, message_id = message_id)
+            if response is None:
+                # communication issue -> retry after backoff
+                self._set_backoff(pin_key, None)
+            elif response["ok"]:
+                self._msgidcache.set_pinned_message_id(raidchannel.chat_id, raidchannel.message_thread_id, message_id)
+                self._backoff_dict.pop(pin_key, None)
+                # bot API doesn't return the id of the pin notice (service message). It only directly follows the pinned message,
+                # if the message was just sent -> delete it only in this case and only after a successful pin
+                if delete_pin_notice and not self._msgidcache.is_raid_message_id(raidchannel.chat_id, message_id + 1):
+                    log.debug("delete pin info message...")
+                    self._tgapi.delete_message(chat_id = raidchannel.chat_id, message_id = message_id + 1)
+            elif response.get("error_code") in PERMANENT_PIN_ERROR_CODES:
+                # e.g. missing admin rights or chat not found -> don't retry pin of this message
+                log.warning(f"pin of message {message_id} failed for raid channel '{channel_key}': {response.get('description')}")
+                self._pin_failed_set.add((channel_key, message_id))
+            else:
+                # rate limit or temporary error -> retry after backoff
+                self._set_backoff(pin_key, response)
+        except Exception as e:
+            # a failed pin must never abort the update cycle
+            log.exception(f"Exception '{type(e)}' in _pin_tg_msg()")
+            self._set_backoff(pin_key, None)
+
+    @staticmethod
+    def _get_channel_key(raidchannel:RaidChannel) -> str:
+        return f"{raidchannel.chat_id}:{raidchannel.message_thread_id}"
+
+    def _set_backoff(self, channel_key:str, response:dict) -> None:
+        """defer next Telegram requests of raid channel: 'retry_after' of a 429 response or exponential backoff in update cycles"""
+
+        failure_count = self._backoff_dict.get(channel_key, (0, 0))[1] + 1
+        retry_after = None
+        if isinstance(response, dict):
+            retry_after = response.get("parameters", {}).get("retry_after")
+        if retry_after is None:
+            retry_after = min(cfg.sleep_mainloop_in_s * 2 ** (failure_count - 1), MAX_BACKOFF_IN_S)
+        self._backoff_dict[channel_key] = (time.time() + retry_after, failure_count)
+        log.warning(f"Telegram request for raid channel '{channel_key}' failed {failure_count}x -> retry in {retry_after}s")
+
+    def _is_backed_off(self, channel_key:str) -> bool:
+        backoff = self._backoff_dict.get(channel_key)
+        return backoff is not None and time.time() < backoff[0]
 
     def update_tg_raid_msg(self, raidchannel:RaidChannel, msg:str) -> None:
+        """edit raid message of raid channel, if text changed. Channels without (valid) message are queued for recreation,
+        see _recreate_tg_msgs(). After failed requests the channel is skipped until backoff time is over"""
+
         msg = SimpleTelegramApi.util_smart_trim_text(msg, trim_end_str = cfg.tmpl_msglimit_reached_msg)
-        # no old message to update found -> send new message
+        msg_hash = hashlib.blake2b(msg.encode("utf8"), digest_size=8).hexdigest()
+        channel_key = self._get_channel_key(raidchannel)
+        if self._is_backed_off(channel_key):
+            metrics.edits_total.inc(result="deferred")
+            return
         message_id = self._msgidcache.get_message_id(raidchannel.chat_id, raidchannel.message_thread_id)
         if message_id is None:
-            #send new message
-            self._send_new_tg_msg(chat_id=raidchannel.chat_id, msg=msg, message_thread_id=raidchannel.message_thread_id, pin_msg=raidchannel.pin_msg)
+            # no old message to update found -> send new message
+            self._recreate_list.append((raidchannel, msg, msg_hash))
+            return
+        if self._last_msg_hash_dict.get(channel_key) == [message_id, msg_hash]:
+            # same text already sent into this message -> no Telegram request needed
+            metrics.edits_total.inc(result="skipped")
         # update old message
         else:
             try:
                 response = self._tgapi.edit_message(chat_id=raidchannel.chat_id, message_id=message_id, text=msg)
-                log.debug(f"edit msg, response:{response}")
-                if response is not None and not self._tgapi.is_response_ok(response):
-                    # we got a valid response, but error reported -> we need to create new message
+                log.debug("edit msg, response:%s", response)
+                if response is None:
+                    # communication issue -> retry after backoff, old message is kept
+                    metrics.edits_total.inc(result="failed")
+                    self._set_backoff(channel_key, None)
+                    return
+                elif response["ok"]:
+                    metrics.edits_total.inc(result="sent")
+                elif self._tgapi.is_response_ok(response):
+                    # TG reported 'message is not modified'
+                    metrics.edits_total.inc(result="skipped")
+                elif response.get("error_code") == 400 and any(description in response.get("description", "") for description in RECREATE_MSG_ERROR_DESCRIPTIONS):
+                    # old message is gone -> we need to create new message
+                    metrics.edits_total.inc(result="failed")
                     log.warning(f"update raid msg failed for chat_id:'{raidchannel.chat_id}' -> send new message...")
-                    self._send_new_tg_msg(chat_id=raidchannel.chat_id, msg=msg, message_thread_id=raidchannel.message_thread_id, pin_msg=raidchannel.pin_msg)
+                    self._recreate_list.append((raidchannel, msg, msg_hash))
+                    return
+                else:
+                    # rate limit or temporary error -> retry after backoff, old message is kept
+                    metrics.edits_total.inc(result="failed")
+                    self._set_backoff(channel_key, response)
+                    return
             except Exception as e:
                 log.exception(f"Exception '{type(e)}' in update_raid_msg()")
+                return
+        self._last_msg_hash_dict[channel_key] = [message_id, msg_hash]
+        self._backoff_dict.pop(channel_key, None)
+        if raidchannel.pin_msg:
+            self._pin_tg_msg(raidchannel, message_id)
+
+    def _recreate_tg_msgs(self) -> None:
+        """send new messages for all raid channels queued during the update cycle. Each new message is pinned directly
+        after it was sent, so the pin notice still follows the message (topics of a supergroup share message ids)"""
+
+        recreate_list = self._recreate_list
+        self._recreate_list = []
+        if not recreate_list:
+            return
+        log.info(f"send new raid messages for {len(recreate_list)} raid channels...")
+        for raidchannel, msg, msg_hash in recreate_list:
+            channel_key = self._get_channel_key(raidchannel)
+            response = self._send_new_tg_msg(chat_id=raidchannel.chat_id, msg=msg, message_thread_id=raidchannel.message_thread_id)
+            if response is None or not response["ok"]:
+                self._set_backoff(channel_key, response)
+                continue
+            message_id = response["result"]["message_id"]
+            self._msgidcache.set_message_id(raidchannel.chat_id, raidchannel.message_thread_id, message_id)
+            self._last_msg_hash_dict[channel_key] = [message_id, msg_hash]
+            self._backoff_dict.pop(channel_key, None)
+            if raidchannel.pin_msg:
+                self._pin_tg_msg(raidchannel, message_id, delete_pin_notice=True)
 
     def convert_timestamp_to_str(self, timestamp:int, stringformat:str="%H:%M") -> str:
         return datetime.fromtimestamp(timestamp).strftime(stringformat)
 
-    def create_raid_msg(self, raidinfo_list:List[Dict]) -> str:
+    def create_raid_msg(self, raidinfo_list:Iterable[Raid], max_msg_len:int=None) -> str:
+        return self._create_raid_msg(raidinfo_list, max_msg_len)[0]
+
+    def _create_raid_msg(self, raidinfo_list:Iterable[Raid], max_msg_len:int=None) -> Tuple[str, int, int]:
+        """create raid message part and return it together with number of included raids and highest included raid level.
+        If max_msg_len is set, raids are no longer consumed as soon as message part is longer than max_msg_len"""
         new_raid_msg = ""
-        if raidinfo_list:
-            for raidinfo in raidinfo_list:
-                # get all keyword data
-                v_time_start = self.convert_timestamp_to_str(raidinfo['raid_battle_timestamp'], cfg.format_time)
-                v_time_end = self.convert_timestamp_to_str(raidinfo['raid_end_timestamp'], cfg.format_time)
-                max_len = cfg.format_max_gymname_len
-                if raidinfo['gym_name'] is None:
-                    v_gym_name = cfg.format_unknown_gym_name
-                else:
-                    gym_name = raidinfo['gym_name']
-                    v_gym_name = (gym_name[:(max_len-2)] + '..') if len(gym_name) > max_len else gym_name
-                v_lat = raidinfo['lat']
-                v_lon = raidinfo['lon']
-                v_gmaps_url = f"https://maps.google.de/?q={v_lat:.{cfg.format_coords_decimal_places}f},{v_lon:.{cfg.format_coords_decimal_places}f}"
-                v_raidlevel_name = self._pogodata.get_raidlevel_name(raidinfo['raid_level'])
-                v_raidlevel_num = raidinfo['raid_level']
-                v_raidlvl_emoji = self._get_raidlevel_emoji(v_raidlevel_num)
-                keywords = dict(
-                    raidlvl_name = v_raidlevel_name,
-                    raidlvl_num = v_raidlevel_num,
-                    raidlvl_emoji = v_raidlvl_emoji,
-                    time_start = v_time_start,
-                    time_end = v_time_end,
-                    gym_name = v_gym_name,
-                    gmaps_url = v_gmaps_url,
-                    lat = v_lat,
-                    lon = v_lon
+        raid_count = 0
+        max_raid_level = 0
+        # render time only: fetching of streamed raids (between loop iterations) is measured by db_query_seconds
+        render_start = time.perf_counter()
+        if isinstance(raidinfo_list, list):
+            # complete raid list available (not streamed) -> convert all timestamps in one batch
+            self._time_formatter.prefill([raidinfo.raid_battle_timestamp for raidinfo in raidinfo_list] + [raidinfo.raid_end_timestamp for raidinfo in raidinfo_list])
+        render_seconds = time.perf_counter() - render_start
+        for raidinfo in (raidinfo_list or ()):
+            render_start = time.perf_counter()
+            raid_count += 1
+            max_raid_level = max(max_raid_level, raidinfo.raid_level)
+            # get all keyword data
+            v_time_start = self._time_formatter.format(raidinfo.raid_battle_timestamp)
+            v_time_end = self._time_formatter.format(raidinfo.raid_end_timestamp)
+            max_len = cfg.format_max_gymname_len
+            if raidinfo.gym_name is None:
+                v_gym_name = cfg.format_unknown_gym_name
+            else:
+                gym_name = raidinfo.gym_name
+                v_gym_name = (gym_name[:(max_len-2)] + '..') if len(gym_name) > max_len else gym_name
+            v_lat = raidinfo.lat
+            v_lon = raidinfo.lon
+            v_gmaps_url = f"https://maps.google.de/?q={v_lat:.{cfg.format_coords_decimal_places}f},{v_lon:.{cfg.format_coords_decimal_places}f}"
+            v_raidlevel_name = self._pogodata.get_raidlevel_name(raidinfo.raid_level)
+            v_raidlevel_num = raidinfo.raid_level
+            v_raidlvl_emoji = self._get_raidlevel_emoji(v_raidlevel_num)
+            keywords = dict(
+                raidlvl_name = v_raidlevel_name,
+                raidlvl_num = v_raidlevel_num,
+                raidlvl_emoji = v_raidlvl_emoji,
+                time_start = v_time_start,
+                time_end = v_time_end,
+                gym_name = v_gym_name,
+                gmaps_url = v_gmaps_url,
+                lat = v_lat,
+                lon = v_lon
+            )
+            # Raid-egg?
+            if raidinfo.raid_pokemon_id == 0:
+                # Raid-egg
+                new_raid_msg += self._tmpl_raidegg_msg.safe_substitute(keywords) + "\n"
+            else:
+                #calculate additional keywords (started raid only)
+                v_atk_fast = self._pogodata.get_move_name(raidinfo.atk_fast)
+                v_atk_charge = self._pogodata.get_move_name(raidinfo.atk_charge)
+                v_pokemon_name = self._pogodata.get_pokemon_name(raidinfo.raid_pokemon_id)
+                keywords.update(
+                    atk_fast = v_atk_fast,
+                    atk_charge = v_atk_charge,
+                    pokemon_name = v_pokemon_name
                 )
-                # Raid-egg?
-                if raidinfo['raid_pokemon_id'] == 0:
-                    # Raid-egg
-                    new_raid_msg += Template(cfg.tmpl_raidegg_msg).safe_substitute(keywords) + "\n"
-                else:
-                    #calculate additional keywords (started raid only)
-                    v_atk_fast = self._pogodata.get_move_name(raidinfo['atk_fast'])
-                    v_atk_charge = self._pogodata.get_move_name(raidinfo['atk_charge'])
-                    v_pokemon_name = self._pogodata.get_pokemon_name(raidinfo['raid_pokemon_id'])
-                    keywords.update(
-                        atk_fast = v_atk_fast,
-                        atk_charge = v_atk_charge,
-                        pokemon_name = v_pokemon_name
-                    )
-                    new_raid_msg += Template(cfg.tmpl_raid_msg).safe_substitute(keywords) + "\n"
-        return new_raid_msg
+                new_raid_msg += self._tmpl_raid_msg.safe_substitute(keywords) + "\n"
+            render_seconds += time.perf_counter() - render_start
+            if max_msg_len is not None and len(new_raid_msg) > max_msg_len:
+                # message will be trimmed anyway -> stop consuming (streamed) raids
+                break
+        metrics.render_seconds.observe(render_seconds)
+        return new_raid_msg, raid_count, max_raid_level
 
     def _get_raidlevel_emoji(self, raidlevel:int) -> str:
         raidlevel_emoji = ["0️⃣","1️⃣","2️⃣","3️⃣","4️⃣","5️⃣","6️⃣","7️⃣","8️⃣","9️⃣","🔟"]
@@ -167,13 +347,24 @@ class TelegramRaidbot():
         return emoji
 
     def _load_geofences_from_koji(self):
-        log.debug("_load_geofences_from_koji()...")
+        """load all geofences from Koji api of actual configuration"""
         if cfg.koji_api_link != "":
+            self._koji_geofencelist = self._fetch_koji_geofences(cfg.koji_api_link, cfg.koji_bearer_token)
+
+    def _fetch_koji_geofences(self, koji_api_link:str, koji_bearer_token:str) -> List[Dict]:
+        """download all geofences from Koji api and return them (empty list without api link). Function can run in background thread
+
+        Raises:
+            KeyError: Koji api not reachable or unexpected response
+        """
+        log.debug("_fetch_koji_geofences()...")
+        koji_geofencelist = []
+        if koji_api_link != "":
             header = {"Content-Type": "application/json"}
-            if cfg.koji_bearer_token != "":
-                header.update({"Authorization": f"Bearer {cfg.koji_bearer_token}"})
+            if koji_bearer_token != "":
+                header.update({"Authorization": f"Bearer {koji_bearer_token}"})
             try:
-                response = requests.get(cfg.koji_api_link, headers=header)
+                response = requests.get(koji_api_link, headers=header, timeout=KOJI_REQUEST_TIMEOUT_IN_S)
                 response.raise_for_status()
             except requests.exceptions.RequestException as err:
                 log.error(f"Koji API connection issue: {err}")
@@ -181,7 +372,7 @@ class TelegramRaidbot():
             try:
                 decoded_response = json.loads(response.content.decode("utf8"))
                 area_list = decoded_response['data']
-                log.debug(f"Koji Data: {area_list}")
+                log_payload(log, "Koji Data: %s", area_list)
                 for area in area_list:
                     geofence_str = ""
                     first = True
@@ -195,18 +386,19 @@ class TelegramRaidbot():
                         "name":f"{area['name']}",
                         "geofence":geofence_str
                     }
-                    self._koji_geofencelist.append(new_area)
-                log.debug(f"self._arealist: {self._koji_geofencelist}")
+                    koji_geofencelist.append(new_area)
+                log_payload(log, "koji_geofencelist: %s", koji_geofencelist)
             except Exception:
-                log.exception("Exception in _load_geofences_from_koji(): ")
+                log.exception("Exception in _fetch_koji_geofences(): ")
                 raise KeyError
-        log.debug("_load_geofences_from_koji() done")
+        log.debug("_fetch_koji_geofences() done")
+        return koji_geofencelist
 
-    def _get_geofence_from_koji(self, geofencename:str) -> str:
+    def _get_geofence_from_koji(self, geofencename:str, koji_geofencelist:List[Dict]) -> str:
         geofence_str = None
         try:
-            if self._koji_geofencelist:
-                for koji_geofence in self._koji_geofencelist:
+            if koji_geofencelist:
+                for koji_geofence in koji_geofencelist:
                     if geofencename == koji_geofence['name']:
                         geofence_str = koji_geofence['geofence']
         except Exception:
@@ -214,79 +406,540 @@ class TelegramRaidbot():
             raise KeyError
         return geofence_str
 
-    def update_raids(self):
+    def _resolve_koji_geofence(self, raidconfig:Dict, koji_geofencelist:List[Dict]) -> Dict:
+        """return copy of raidconfig with 'geofence' replaced by Koji geofence, if 'geofence_koji' is set"""
+
+        raidconfig = dict(raidconfig)
+        koji_geofencename = raidconfig['geofence_koji']
+        if koji_geofencename != "":
+            geofence_str = self._get_geofence_from_koji(koji_geofencename, koji_geofencelist)
+            if geofence_str:
+                # overwrite raidconfig['geofence']
+                raidconfig['geofence'] = geofence_str
+            else:
+                log.error(f"Koji api don't provide geofence with name '{koji_geofencename}'")
+                raise KeyError
+        return raidconfig
+
+    def _create_raidchannel_list(self, raidconfig_list:List[Dict], koji_geofencelist:List[Dict]=None) -> List[RaidChannel]:
+        """create raid channels for raidconfig_list (Koji geofences: koji_geofencelist or actual geofences).
+        Existing raid channels with unchanged configuration are reused
+
+        Raises:
+            KeyError: unknown Koji geofence or invalid geofence
+        """
+
+        if koji_geofencelist is None:
+            koji_geofencelist = self._koji_geofencelist
+        old_raidchannel_list = list(self.raidchannel_list)
+        raidchannel_list = []
+        for raidconfig in raidconfig_list:
+            raidconfig = self._resolve_koji_geofence(raidconfig, koji_geofencelist)
+            # invalid geofence would break the scanner query of every update cycle
+            if raidconfig['geofence'] != "" and not is_valid_geofence(raidconfig['geofence']):
+                log.error(f"[[raidconfig]] parameter issue: invalid geofence for chat_id '{raidconfig['chat_id']}'. Format: 'lat_1 lon_1, lat_2 lon_2, lat_3 lon_3, ...'")
+                raise KeyError
+            raidchannel = next((old_raidchannel for old_raidchannel in old_raidchannel_list if old_raidchannel.raidconfig == raidconfig), None)
+            if raidchannel is None:
+                raidchannel = RaidChannel(raidconfig)
+            else:
+                old_raidchannel_list.remove(raidchannel)
+            raidchannel_list.append(raidchannel)
+        return raidchannel_list
+
+    def _compile_templates(self) -> None:
+        self._tmpl_raid_msg = Template(cfg.tmpl_raid_msg)
+        self._tmpl_raidegg_msg = Template(cfg.tmpl_raidegg_msg)
+        self._tmpl_grouped_title_msg = Template(cfg.tmpl_grouped_title_msg)
+
+    def set_profile_dir(self, output_dir:str) -> None:
+        """output directory of profiling reports"""
+        self._profiler = CycleProfiler(output_dir)
+
+    def request_profile(self, cycles:int=DEFAULT_PROFILE_CYCLES) -> None:
+        """profile the next 'cycles' update_raids() calls (cProfile, tracemalloc, per channel durations). Thread safe"""
+        self._profiler.request(cycles)
+
+    def _request_profile_signal(self, signum=None, frame=None) -> None:
+        """SIGUSR1 handler: profile next update cycles"""
+        self._profiler.request()
+
+    def _request_reload(self, signum=None, frame=None) -> None:
+        """SIGHUP handler: reload configuration in main loop"""
+        self._reload_requested = True
+        self._wakeup_event.set()
+
+    def reload_config(self) -> None:
+        """reload config.toml and take over changes without restart.
+        Only new or changed raid channels are rebuilt (and updated immediately), caches and connections are kept.
+        Downloads needed by the new configuration (translations, Koji geofences) run in background. The new configuration
+        is taken over completely or not at all by _check_pending_reload()"""
+
+        log.info("reload configuration...")
+        try:
+            new_cfg, changed_parameter_set = cfg.load_changes()
+        except KeyError:
+            log.error("reload configuration failed: config error. Keep running with old configuration")
+            return
+        if not changed_parameter_set:
+            log.info("reload configuration: no changes")
+            return
+        log.info(f"reload configuration: changed parameter {sorted(changed_parameter_set)}")
+        pogodata_future = None
+        if "format_language" in changed_parameter_set:
+            pogodata_future = self._refresh_executor.submit(self._load_pogodata, new_cfg.format_language)
+        koji_future = None
+        koji_name_set = {koji_geofence['name'] for koji_geofence in self._koji_geofencelist}
+        if "koji_api_link" in changed_parameter_set or "koji_bearer_token" in changed_parameter_set \
+                or any(raidconfig['geofence_koji'] not in koji_name_set for raidconfig in new_cfg.raidconfig_list if raidconfig['geofence_koji'] != ""):
+            # new Koji project or new Koji geofence name -> update Koji geofences
+            koji_future = self._refresh_executor.submit(self._fetch_koji_geofences, new_cfg.koji_api_link, new_cfg.koji_bearer_token)
+        for future in (pogodata_future, koji_future):
+            if future is not None:
+                future.add_done_callback(lambda future: self._wakeup_event.set())
+        self._pending_reload = (new_cfg, changed_parameter_set, pogodata_future, koji_future)
+        self._check_pending_reload()
+
+    def _load_pogodata(self, language:str) -> Pogodata:
+        """download translations of language (background thread)
+
+        Raises:
+            KeyError: translations not available
+        """
+        pogodata = Pogodata(language)
+        pogodata.update()
+        if not pogodata.get_translations():
+            log.error(f"no translations available for format_language '{language}'")
+            raise KeyError
+        return pogodata
+
+    def _check_pending_reload(self) -> None:
+        """take over reloaded configuration as soon as its background downloads are finished. On errors nothing is changed"""
+
+        if self._pending_reload is None:
+            return
+        new_cfg, changed_parameter_set, pogodata_future, koji_future = self._pending_reload
+        if any(future is not None and not future.done() for future in (pogodata_future, koji_future)):
+            return
+        self._pending_reload = None
+        try:
+            pogodata = self._pogodata if pogodata_future is None else pogodata_future.result()
+            koji_geofencelist = self._koji_geofencelist if koji_future is None else koji_future.result()
+            raidchannel_list = self._create_raidchannel_list(new_cfg.raidconfig_list, koji_geofencelist)
+        except KeyError:
+            log.error("reload configuration failed: config error. Keep running with old configuration")
+            return
+        # everything valid -> take over configuration, templates, translations, geofences and raid channels together
+        cfg.apply_changes(new_cfg, changed_parameter_set)
+        if any(name.startswith("tmpl_") for name in changed_parameter_set):
+            self._compile_templates()
+        if pogodata is not self._pogodata:
+            self._pogodata = pogodata
+            self._pogodata_future = None
+        self._koji_geofencelist = koji_geofencelist
+        changed_raidchannel_list = self._replace_raidchannel_list(raidchannel_list)
+        if changed_parameter_set - {"raidconfig_list"}:
+            # global parameter (format, templates, ...) changed -> update all raid channels
+            changed_raidchannel_list = raidchannel_list
+        with self._pending_lock:
+            self._pending_raidchannel_set |= set(changed_raidchannel_list)
+
+    def _replace_raidchannel_list(self, raidchannel_list:List[RaidChannel]) -> List[RaidChannel]:
+        """use new raid channel list and return new/changed raid channels"""
+
+        changed_raidchannel_list = [raidchannel for raidchannel in raidchannel_list if raidchannel not in self.raidchannel_list]
+        removed_count = len([raidchannel for raidchannel in self.raidchannel_list if raidchannel not in raidchannel_list])
+        self.raidchannel_list = raidchannel_list
+        log.info(f"raid channels updated: {len(changed_raidchannel_list)} new/changed, {removed_count} removed raid channels")
+        return changed_raidchannel_list
+
+    def _get_db_scannerconnector(self):
+        """scanner database connector (in webhook mode the raid store is used for raid queries)"""
+        return self._reconcile_scannerconnector if self._reconcile_scannerconnector is not None else self._scannerconnector
+
+    def _create_warm_state(self) -> Dict:
+        """collect state for warm start snapshot"""
+
+        return {
+            "pogodata": {"language": self._pogodata.language, "translations": self._pogodata.get_translations()},
+            "koji_geofences": self._koji_geofencelist,
+            "scanner": self._get_db_scannerconnector().get_warm_state(),
+            "msg_hashes": self._last_msg_hash_dict
+        }
+
+    def _start_pogodata_update(self) -> None:
+        """update Pogodata translations in background (skipped, if last update still running)"""
+
+        if self._pogodata_future is None or self._pogodata_future.done():
+            self._pogodata_future = self._refresh_executor.submit(self._pogodata.update)
+
+    def _check_koji_refresh(self) -> None:
+        """take over Koji geofences of finished background refresh: changed raid channels are rebuilt and updated"""
+
+        if self._koji_future is None or not self._koji_future.done():
+            return
+        koji_future = self._koji_future
+        self._koji_future = None
+        if koji_future.exception() is not None:
+            log.error("Koji geofence refresh failed -> keep geofences of warm start snapshot")
+            return
+        koji_geofencelist = koji_future.result()
+        try:
+            raidchannel_list = self._create_raidchannel_list(cfg.raidconfig_list, koji_geofencelist)
+        except KeyError:
+            log.error("Koji geofence refresh: geofence missing -> keep geofences of warm start snapshot")
+            return
+        self._koji_geofencelist = koji_geofencelist
+        changed_raidchannel_list = self._replace_raidchannel_list(raidchannel_list)
+        with self._pending_lock:
+            self._pending_raidchannel_set |= set(changed_raidchannel_list)
+
+    def _start_update_cycle(self) -> None:
+        """reset per cycle state: timestamp string cache and update time footer (formatted once for all raid channels)"""
+        self._time_formatter = TimestampFormatter(cfg.format_time)
+        self._cycle_deadline = time.perf_counter() + (cfg.cycle_deadline_in_s or cfg.sleep_mainloop_in_s)
+        # add actual date + time (so everyone can see when raid message was updated last time)
+        self._footer_msg = f"\n\u23F1 {datetime.now().strftime('%d.%m.%y %H:%M')}"
+
+    def update_raids(self, raidchannel_list:List[RaidChannel]=None):
+        """update raid messages of all raid channels (or only of raidchannel_list, if provided)"""
         log.debug("update_raids()...")
-        for raidchannel in self.raidchannel_list:
-            new_raid_msg = ""
-            if raidchannel.raidlevel_grouping:
-                # raidlevel grouping activated (true)
-                for raid_level in raidchannel.raidlevel_list:
-                    # get raid data from scanner for each configurated raid level
-                    raidinfo_list = self._scannerconnector.get_raids([raid_level], raidchannel.eggs, raidchannel.geofence, raidchannel.order_time_reverse)
-                    if raidinfo_list:
-                        # create message part for raid level
-                        v_raidlvl_name = self._pogodata.get_raidlevel_name(raid_level, True)
-                        v_raidlvl_emoji = self._get_raidlevel_emoji(raid_level)
-                        keywords = dict(
-                            raidlvl_name = v_raidlvl_name,
-                            raidlvl_num = raid_level,
-                            raidlvl_emoji = v_raidlvl_emoji
-                        )
-                        new_raid_msg += Template(cfg.tmpl_grouped_title_msg).safe_substitute(keywords) + "\n"
-                        new_raid_msg += self.create_raid_msg(raidinfo_list)
+        if raidchannel_list is None:
+            raidchannel_list = self.raidchannel_list
+        # high priority channels first (stable sort: configuration order within same priority)
+        raidchannel_list = sorted(raidchannel_list, key=lambda raidchannel: not raidchannel.is_high_priority())
+        self._start_update_cycle()
+        if self._recorder is not None:
+            self._recorder.start_cycle([self._get_channel_key(raidchannel) for raidchannel in raidchannel_list])
+        with metrics.cycle_seconds.time(), self._profiler.cycle():
+            if self._scannerconnector.is_async:
+                self._async_loop.run_until_complete(self._update_raids_async(raidchannel_list))
             else:
-                # raidlevel grouping not activated (false) -> get all raid data for all configurated raid level
-                raidinfo_list = self._scannerconnector.get_raids(raidchannel.raidlevel_list, raidchannel.eggs, raidchannel.geofence, raidchannel.order_time_reverse)
-                new_raid_msg = self.create_raid_msg(raidinfo_list)
-            # check for empty raidmessage (no raids) -> send out 'tmpl_no_raid_msg' from config.toml
-            if new_raid_msg == "":
-                new_raid_msg = cfg.tmpl_no_raids_msg + "\n"
-            # add actual date + time (so everyone can see when raid message was updated last time)
-            new_raid_msg += f"\n\u23F1 {datetime.now().strftime('%d.%m.%y %H:%M')}"
-            log.debug(f"new raid_msg (len:{len(new_raid_msg)}):\n{new_raid_msg}")
-            self.update_tg_raid_msg(raidchannel, new_raid_msg)
-        self._msgidcache.store_cache()
+                self._update_raids(raidchannel_list)
         log.debug("update_raids() done")
 
+    def _create_channel_msg(self, raidchannel:RaidChannel, get_raids) -> Tuple[str, int, int]:
+        """create raid message of raidchannel and return it together with number of included raids and highest included raid level.
+        get_raids(raidlevel_list) need to return a context manager providing the raids of the raid levels"""
+
+        new_raid_msg = ""
+        raid_count = 0
+        max_raid_level = 0
+        if raidchannel.raidlevel_grouping:
+            # raidlevel grouping activated (true)
+            for raid_level in raidchannel.raidlevel_list:
+                if len(new_raid_msg) > MAX_MSG_LEN:
+                    # message limit already reached -> skip query of remaining raid levels
+                    break
+                # create message part for raid level
+                v_raidlvl_name = self._pogodata.get_raidlevel_name(raid_level, True)
+                v_raidlvl_emoji = self._get_raidlevel_emoji(raid_level)
+                keywords = dict(
+                    raidlvl_name = v_raidlvl_name,
+                    raidlvl_num = raid_level,
+                    raidlvl_emoji = v_raidlvl_emoji
+                )
+                title_msg = self._tmpl_grouped_title_msg.safe_substitute(keywords) + "\n"
+                # get raid data from scanner for each configurated raid level
+                with get_raids([raid_level]) as raidinfo_list:
+                    level_raid_msg, level_raid_count, level_max_raid_level = self._create_raid_msg(raidinfo_list, MAX_MSG_LEN - len(new_raid_msg) - len(title_msg))
+                if level_raid_count:
+                    raid_count += level_raid_count
+                    max_raid_level = max(max_raid_level, level_max_raid_level)
+                    new_raid_msg += title_msg + level_raid_msg
+        else:
+            # raidlevel grouping not activated (false) -> get all raid data for all configurated raid level
+            with get_raids(raidchannel.raidlevel_list) as raidinfo_list:
+                new_raid_msg, raid_count, max_raid_level = self._create_raid_msg(raidinfo_list, MAX_MSG_LEN)
+        # check for empty raidmessage (no raids) -> send out 'tmpl_no_raid_msg' from config.toml
+        if new_raid_msg == "":
+            new_raid_msg = cfg.tmpl_no_raids_msg + "\n"
+        # update time footer (formatted once per cycle)
+        new_raid_msg += self._footer_msg
+        log.debug("new raid_msg (len:%d):\n%s", len(new_raid_msg), Truncated(new_raid_msg))
+        return new_raid_msg, raid_count, max_raid_level
+
+    def _update_channel_schedule(self, raidchannel:RaidChannel, new_raid_msg:str, max_raid_level:int) -> None:
+        """update scheduling state of raid channel after its raid message was created"""
+
+        # footer changes every minute -> only compare raid content
+        content_hash = hash(new_raid_msg[:len(new_raid_msg) - len(self._footer_msg)])
+        if content_hash != raidchannel.last_content_hash:
+            raidchannel.last_content_hash = content_hash
+            raidchannel.last_change_time = time.time()
+        raidchannel.max_raid_level = max_raid_level
+        raidchannel.deferred = False
+
+    def _defer_if_overloaded(self, raidchannel:RaidChannel) -> bool:
+        """cycle deadline exceeded: defer low priority raid channel to next cycle (it is updated first there). Return True, if deferred"""
+
+        if time.perf_counter() < self._cycle_deadline or raidchannel.is_high_priority():
+            return False
+        raidchannel.deferred = True
+        metrics.deferred_channels_total.inc()
+        metrics.queue_depth.dec()
+        return True
+
+    def _update_raids(self, raidchannel_list:List[RaidChannel]):
+        metrics.queue_depth.set(len(raidchannel_list))
+        for raidchannel in raidchannel_list:
+            if self._defer_if_overloaded(raidchannel):
+                continue
+            # raids are streamed from scanner while message is created
+            get_raids = lambda raidlevel_list: closing(self._scannerconnector.iter_raids(raidlevel_list, raidchannel.eggs, raidchannel.geofence, raidchannel.order_time_reverse, raidchannel.geofence_gym_ids))
+            with self._profiler.channel(self._get_channel_key(raidchannel)):
+                new_raid_msg, raid_count, max_raid_level = self._create_channel_msg(raidchannel, get_raids)
+                self._update_channel_schedule(raidchannel, new_raid_msg, max_raid_level)
+                self.update_tg_raid_msg(raidchannel, new_raid_msg)
+            metrics.shown_raids.set(raid_count, chat_id=raidchannel.chat_id, message_thread_id=raidchannel.message_thread_id)
+            metrics.queue_depth.dec()
+        self._recreate_tg_msgs()
+        self._msgidcache.store_cache()
+
+    async def _fetch_channel_raids(self, raidchannel:RaidChannel) -> Dict[Tuple[int, ...], List[Raid]]:
+        """query all raids needed for raidchannel concurrently. Return dict: raidlevel tuple -> raid list"""
+
+        if raidchannel.raidlevel_grouping:
+            raidlevel_lists = [(raid_level,) for raid_level in raidchannel.raidlevel_list]
+        else:
+            raidlevel_lists = [tuple(raidchannel.raidlevel_list)]
+        raids_list = await asyncio.gather(*[self._scannerconnector.get_raids(list(raidlevel_list), raidchannel.eggs, raidchannel.geofence, raidchannel.order_time_reverse, raidchannel.geofence_gym_ids) for raidlevel_list in raidlevel_lists])
+        return dict(zip(raidlevel_lists, raids_list))
+
+    async def _update_raids_async(self, raidchannel_list:List[RaidChannel]):
+        """same as _update_raids(), but all scanner queries run concurrently and overlap with Telegram dispatch of already fetched channels"""
+
+        loop = asyncio.get_running_loop()
+        metrics.queue_depth.set(len(raidchannel_list))
+        fetch_tasks = [asyncio.ensure_future(self._fetch_channel_raids(raidchannel)) for raidchannel in raidchannel_list]
+        try:
+            for raidchannel, fetch_task in zip(raidchannel_list, fetch_tasks):
+                if self._defer_if_overloaded(raidchannel):
+                    fetch_task.cancel()
+                    continue
+                # profiled channel duration includes waiting for the (concurrently started) scanner queries
+                with self._profiler.channel(self._get_channel_key(raidchannel)):
+                    try:
+                        channel_raids = await asyncio.wait_for(fetch_task, timeout=max(0, self._cycle_deadline - time.perf_counter()) if not raidchannel.is_high_priority() else None)
+                    except asyncio.TimeoutError:
+                        # scanner queries of low priority channel exceeded cycle deadline -> defer
+                        self._defer_if_overloaded(raidchannel)
+                        continue
+                    get_raids = lambda raidlevel_list: nullcontext(channel_raids[tuple(raidlevel_list)])
+                    new_raid_msg, raid_count, max_raid_level = self._create_channel_msg(raidchannel, get_raids)
+                    self._update_channel_schedule(raidchannel, new_raid_msg, max_raid_level)
+                    # blocking Telegram request in executor thread -> queries of next channels proceed meanwhile
+                    await loop.run_in_executor(None, self._profiler.run_in_worker, self.update_tg_raid_msg, raidchannel, new_raid_msg)
+                metrics.shown_raids.set(raid_count, chat_id=raidchannel.chat_id, message_thread_id=raidchannel.message_thread_id)
+                metrics.queue_depth.dec()
+        finally:
+            for fetch_task in fetch_tasks:
+                fetch_task.cancel()
+        await loop.run_in_executor(None, self._profiler.run_in_worker, self._recreate_tg_msgs)
+        self._msgidcache.store_cache()
+
+    def _on_webhook_raids(self, raid_list:List[Raid]) -> None:
+        """webhook receiver callback (listener thread): mark all raid channels affected by received raids and wake up main loop"""
+
+        affected_raidchannel_set = set()
+        for raidchannel in self.raidchannel_list:
+            for raid in raid_list:
+                if raid.raid_level in raidchannel.raidlevel_list and self._raidstore.is_in_geofence(raid.lat, raid.lon, raidchannel.geofence):
+                    affected_raidchannel_set.add(raidchannel)
+                    break
+        if affected_raidchannel_set:
+            with self._pending_lock:
+                self._pending_raidchannel_set |= affected_raidchannel_set
+            self._wakeup_event.set()
+
+    def _take_pending_raidchannels(self) -> List[RaidChannel]:
+        """return raid channels with pending webhook update (in configuration order) and reset pending set"""
+
+        with self._pending_lock:
+            pending_raidchannel_set = self._pending_raidchannel_set
+            self._pending_raidchannel_set = set()
+        return [raidchannel for raidchannel in self.raidchannel_list if raidchannel in pending_raidchannel_set]
+
+    def _reconcile_raidstore(self) -> None:
+        """replace webhook raid store with all active raids from scanner database (catch missed webhooks)"""
+
+        raidlevel_list = sorted({raid_level for raidchannel in self.raidchannel_list for raid_level in raidchannel.raidlevel_list})
+        if self._reconcile_scannerconnector.is_async:
+            raid_list = self._async_loop.run_until_complete(self._reconcile_scannerconnector.get_all_raids(raidlevel_list))
+        else:
+            raid_list = self._reconcile_scannerconnector.get_all_raids(raidlevel_list)
+        if raid_list is None:
+            # query failed: an empty result would remove all webhook raids -> keep raid store until next reconcile
+            log.warning("webhook raid store reconcile failed (scanner query error) -> keep received raids")
+            return
+        self._raidstore.replace_raids({create_gym_key(raid.lat, raid.lon): raid for raid in raid_list})
+        log.info(f"webhook raid store reconciled with scanner database: {len(raid_list)} raids")
+
+    def start_recording(self, record_filepath:str) -> None:
+        """record scanner rows and Telegram responses of all update cycles of run() into record_filepath (see replay())"""
+        self._recorder = CycleRecorder(record_filepath)
+
+    def replay(self, record_filepath:str, speed:float=0, latency_in_s:float=None) -> Dict:
+        """drive update cycles from a record file without network access and return throughput results.
+        Templates and format parameter are taken from config.toml, raid channels and translations from the record file.
+
+        speed: 0 = as fast as possible, otherwise time scale of recorded cycle intervals (e.g. 10 = ten times faster)
+        latency_in_s: fake latency of every scanner query and Telegram request (None: recorded Telegram latency)
+
+        Raises:
+            KeyError: config error or invalid record file
+        """
+
+        log.info(f"replay '{record_filepath}'...")
+        reader = RecordReader(record_filepath)
+        cfg.load()
+        self._compile_templates()
+        # don't touch message id cache of production bot
+        self._msgidcache = MsgIdCache(os.devnull)
+        self.raidchannel_list = [RaidChannel(raidconfig) for raidconfig in reader.header["raidconfig_list"]]
+        raidchannel_dict = {self._get_channel_key(raidchannel): raidchannel for raidchannel in self.raidchannel_list}
+        self._pogodata = Pogodata(cfg.format_language)
+        self._pogodata.set_translations(reader.header["translations"])
+        self._scannerconnector = ReplayScannerConnector(latency_in_s or 0.0)
+        for geofence_index, geofence in reader.geofence_list:
+            self._scannerconnector.add_geofence(geofence_index, geofence)
+        self._tgapi = ReplayTelegramApi(latency_in_s)
+        start = time.perf_counter()
+        last_cycle_timestamp = None
+        for cycle_timestamp, channel_key_list, rows_dict, response_dict in reader.cycle_list:
+            if speed and last_cycle_timestamp is not None:
+                # recorded interval between cycles, scaled
+                time.sleep(max(0, (cycle_timestamp - last_cycle_timestamp) / speed - (time.perf_counter() - cycle_start)))
+            cycle_start = time.perf_counter()
+            last_cycle_timestamp = cycle_timestamp
+            self._scannerconnector.load_cycle(rows_dict)
+            self._tgapi.load_cycle(response_dict)
+            self.update_raids([raidchannel_dict[channel_key] for channel_key in channel_key_list if channel_key in raidchannel_dict])
+        duration = time.perf_counter() - start
+        result = {
+            "cycles": len(reader.cycle_list),
+            "duration_s": duration,
+            "cycles_per_s": len(reader.cycle_list) / duration if duration else 0.0,
+            "telegram_requests": dict(self._tgapi.request_count),
+            "missing_queries": self._scannerconnector.missing_query_count
+        }
+        log.info(f"replay done: {result}")
+        return result
+
     def run(self):
         log.info("start...")
+        startup_start = time.perf_counter()
         # init
         try:
             self._msgidcache.restore_cache()
             cfg.load()
-            self._load_geofences_from_koji()
-            for raidconfig in cfg.raidconfig_list:
-                koji_geofencename = raidconfig['geofence_koji']
-                if koji_geofencename != "":
-                    geofence_str = self._get_geofence_from_koji(koji_geofencename)
-                    if geofence_str:
-                        # overwrite raidconfig['geofence']
-                        raidconfig['geofence'] = geofence_str
-                    else:
-                        log.error(f"Koji api don't provide geofence with name '{koji_geofencename}'")
-                        raise KeyError
-                self.raidchannel_list.append(RaidChannel(raidconfig))
-            #create scanner connector and tg interface
-            self._scannerconnector = RdmConnector(db_host=cfg.db_host, db_port=cfg.db_port, db_name=cfg.db_name, db_username=cfg.db_user, db_password=cfg.db_password)
-            self._tgapi = SimpleTelegramApi(cfg.api_token)
+            config_mtime = cfg.get_file_mtime()
+            self._compile_templates()
+            warm_state = self._warmstatecache.restore() if cfg.warm_start else {}
+            # translations: from snapshot (refresh in background) or download concurrently to remaining init
             self._pogodata = Pogodata(cfg.format_language)
-            self._pogodata.update()
+            pogodata_state = warm_state.get("pogodata", {})
+            if pogodata_state.get("language") == cfg.format_language and pogodata_state.get("translations"):
+                self._pogodata.set_translations(pogodata_state.get("translations"))
+            else:
+                pogodata_state = {}
+            self._start_pogodata_update()
             last_pogodata_update = time.time()
+            # Koji geofences: from snapshot (refresh in background) or download now
+            self._koji_geofencelist = warm_state.get("koji_geofences", [])
+            if self._koji_geofencelist:
+                self._koji_future = self._refresh_executor.submit(self._fetch_koji_geofences, cfg.koji_api_link, cfg.koji_bearer_token)
+            else:
+                self._load_geofences_from_koji()
+            try:
+                self.raidchannel_list = self._create_raidchannel_list(cfg.raidconfig_list)
+            except KeyError:
+                if self._koji_future is None:
+                    raise
+                # geofence missing in snapshot -> wait for running refresh
+                self._koji_geofencelist = self._koji_future.result()
+                self._koji_future = None
+                self.raidchannel_list = self._create_raidchannel_list(cfg.raidconfig_list)
+            #create scanner connector and tg interface
+            self._scannerconnector = create_scannerconnector(cfg)
+            self._scannerconnector.restore_warm_state(warm_state.get("scanner", {}))
+            self._last_msg_hash_dict = warm_state.get("msg_hashes", {})
+            if self._scannerconnector.is_async:
+                self._async_loop = asyncio.new_event_loop()
+            if cfg.webhook_enabled:
+                # raids are pushed by scanner into raid store, scanner database is only used for periodic reconcile
+                self._reconcile_scannerconnector = self._scannerconnector
+                self._raidstore = MemoryConnector()
+                self._scannerconnector = self._raidstore
+                self._reconcile_raidstore()
+                last_reconcile = time.time()
+                self._webhookreceiver = WebhookReceiver(self._raidstore, self._on_webhook_raids, host=cfg.webhook_host, port=cfg.webhook_port)
+                self._webhookreceiver.start()
+            self._tgapi = SimpleTelegramApi(cfg.api_token, timeout_in_s=cfg.telegram_timeout_in_s)
+            if not pogodata_state:
+                # no translations available yet -> first raid messages need them
+                self._pogodata_future.result()
+            if self._recorder is not None:
+                self._scannerconnector = create_recording_scannerconnector(self._scannerconnector, self._recorder)
+                self._tgapi = RecordingTelegramApi(cfg.api_token, self._recorder, timeout_in_s=cfg.telegram_timeout_in_s)
+                self._recorder.write_header([raidchannel.raidconfig for raidchannel in self.raidchannel_list], self._pogodata.get_translations())
         except KeyError:
             log.error("Config error during run() - init part")
             return
         except Exception:
             log.exception("Unexpected exception during run() - init part")
             return
+        # config reload: SIGHUP or config file change
+        if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGHUP, self._request_reload)
+            # profiling of next update cycles: SIGUSR1
+            signal.signal(signal.SIGUSR1, self._request_profile_signal)
         # cyclic functions
+        next_update = time.time()
+        startup_done = False
         while True:
             try:
-                self.update_raids()
+                if self._reload_requested or cfg.get_file_mtime() != config_mtime:
+                    self._reload_requested = False
+                    config_mtime = cfg.get_file_mtime()
+                    self.reload_config()
+                self._check_pending_reload()
+                self._check_koji_refresh()
+                if time.time() >= next_update:
+                    cycle_start = time.time()
+                    # sleep only the remaining part of the cycle interval, also if the cycle fails (no busy loop)
+                    next_update = cycle_start + cfg.sleep_mainloop_in_s
+                    self.update_raids()
+                    # all raid channels updated -> pending webhook updates are obsolete
+                    self._take_pending_raidchannels()
+                    if cfg.webhook_enabled:
+                        self._raidstore.remove_expired_raids()
+                    if cfg.warm_start:
+                        self._warmstatecache.store(self._create_warm_state())
+                    if not startup_done:
+                        startup_done = True
+                        metrics.startup_seconds.set(time.perf_counter() - startup_start)
+                        log.info(f"startup done: first raid update finished after {metrics.startup_seconds.get():.1f}s")
+                    if time.time() > next_update:
+                        metrics.cycle_overruns_total.inc()
+                        log.warning(f"update cycle took {time.time() - cycle_start:.1f}s (interval {cfg.sleep_mainloop_in_s}s) -> next cycle starts immediately")
+                else:
+                    pending_raidchannel_list = self._take_pending_raidchannels()
+                    if pending_raidchannel_list:
+                        log.debug("webhook update of %d raid channels", len(pending_raidchannel_list))
+                        self.update_raids(pending_raidchannel_list)
                 if (time.time() - last_pogodata_update) > cfg.pogodata_update_cycle_in_s:
-                    self._pogodata.update()
+                    self._start_pogodata_update()
                     last_pogodata_update = time.time()
+                if cfg.webhook_enabled and (time.time() - last_reconcile) > cfg.webhook_reconcile_cycle_in_s:
+                    self._reconcile_raidstore()
+                    last_reconcile = time.time()
             except Exception as e:
                 log.error("exception during run() cycle: ")
                 log.exception(e)
-            time.sleep(cfg.sleep_mainloop_in_s)
+            # sleep until next cycle or until webhook raids arrive
+            if self._wakeup_event.wait(timeout=max(0, next_update - time.time())):
+                self._wakeup_event.clear()
+                # collect further webhook raids of same burst before updating
+                time.sleep(cfg.webhook_debounce_in_s)
 
@@ -0,0 +1,95 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import Iterable, List
+# time handling
+from datetime import datetime
+# logging
+import logging
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+# strftime directives with a resolution below one minute
+SECOND_DIRECTIVES = ("%S", "%f", "%s", "%c", "%X", "%T", "%r")
+# minimum number of timestamps for numpy batch conversion
+NUMPY_BATCH_MIN_SIZE = 256
+# numpy module for vectorized batch conversion (optional dependency, imported on first batch). False: numpy not installed
+_numpy = None
+
+'''
+****************************************
+* Module functions
+****************************************
+'''
+def _import_numpy():
+    """import numpy on first use (keeps startup time and memory low), return None if not installed"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ModuleNotFoundError:
+            _numpy = False
+    return _numpy or None
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: TimestampFormatter
+#****************************************
+class TimestampFormatter():
+    """strftime() formatting of unix timestamps with cache keyed by time bucket (one minute, or one second if stringformat shows seconds).
+
+    Raids share few distinct start/end minutes, so most timestamps are served from cache. Create a new object per update cycle
+    to keep the cache small.
+    """
+
+    def __init__(self, stringformat:str="%H:%M") -> None:
+        self._stringformat = stringformat
+        self._bucket_in_s = 1 if any(directive in stringformat for directive in SECOND_DIRECTIVES) else 60
+        self._cache = {}
+
+    def format(self, timestamp:int) -> str:
+        bucket = int(timestamp) // self._bucket_in_s
+        result = self._cache.get(bucket)
+        if result is None:
+            result = datetime.fromtimestamp(bucket * self._bucket_in_s).strftime(self._stringformat)
+            self._cache[bucket] = result
+        return result
+
+    def format_batch(self, timestamp_list:Iterable[int]) -> List[str]:
+        """format whole timestamp column. With numpy, bucketing and deduplication are vectorized and only distinct buckets are formatted"""
+
+        numpy = _import_numpy()
+        if numpy is None:
+            return [self.format(timestamp) for timestamp in timestamp_list]
+        bucket_array = numpy.asarray(timestamp_list, dtype=numpy.int64) // self._bucket_in_s
+        if bucket_array.size == 0:
+            return []
+        unique_buckets, inverse = numpy.unique(bucket_array, return_inverse=True)
+        unique_strings = [self.format(int(bucket) * self._bucket_in_s) for bucket in unique_buckets]
+        return [unique_strings[index] for index in inverse.ravel()]
+
+    def prefill(self, timestamp_list:Iterable[int]) -> None:
+        """fill cache for all distinct time buckets of the timestamps at once (numpy batch path), if numpy is available and list is large enough.
+        Only used for complete raid lists ([db] async_queries), streamed raids are formatted one by one"""
+
+        timestamp_list = list(timestamp_list)
+        numpy = _import_numpy() if len(timestamp_list) >= NUMPY_BATCH_MIN_SIZE else None
+        if numpy is not None:
+            # no per timestamp output list needed: only the distinct buckets are formatted into the cache
+            for bucket in numpy.unique(numpy.asarray(timestamp_list, dtype=numpy.int64) // self._bucket_in_s):
+                self.format(int(bucket) * self._bucket_in_s)
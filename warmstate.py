@@ -0,0 +1,73 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import Dict
+# os functions (path, ...)
+import os
+# snapshot file
+import json
+# logging
+import logging
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+# increase on incompatible changes of snapshot content -> old snapshots are ignored
+WARM_STATE_VERSION = 1
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: WarmStateCache
+#****************************************
+class WarmStateCache():
+    """Snapshot file of state, which is expensive to rebuild on startup (translations, Koji geofences, gym id lists, last message hashes).
+
+    restore() returns the stored state dict (empty dict, if no valid snapshot exists). Content is defined by the caller,
+    it need to be JSON serializable.
+    """
+
+    def __init__(self, filename:str=".warmstate_cache") -> None:
+        self._filename = filename
+
+    def restore(self) -> Dict:
+        """load snapshot file and return state dict"""
+
+        try:
+            with open(self._filename, "r") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            log.info(f"no warm state snapshot '{self._filename}' found -> cold start")
+            return {}
+        except Exception as e:
+            log.warning(f"can't load warm state snapshot. exception:{e}")
+            return {}
+        if not isinstance(snapshot, dict) or snapshot.get("version") != WARM_STATE_VERSION:
+            log.warning("warm state snapshot has incompatible version -> ignored")
+            return {}
+        log.info(f"warm state snapshot loaded: {sorted(snapshot['state'].keys())}")
+        return snapshot["state"]
+
+    def store(self, state:Dict) -> None:
+        """write state dict into snapshot file. File is replaced atomically, an interrupted write keeps the old snapshot"""
+
+        tmp_filename = self._filename + ".tmp"
+        try:
+            with open(tmp_filename, "w") as f:
+                json.dump({"version": WARM_STATE_VERSION, "state": state}, f)
+            os.replace(tmp_filename, self._filename)
+            log.debug("save warm state snapshot")
+        except Exception as e:
+            log.warning(f"Exception '{type(e)}' in WarmStateCache.store()")
@@ -0,0 +1,126 @@
+#!/usr/local/bin/python
+# -*- coding: utf-8 -*-
+
+'''
+****************************************
+* Import
+****************************************
+'''
+from typing import Callable, Dict, List, Tuple
+# local http listener
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+# logging
+import logging
+# tg_raidbot modules
+import metrics
+from scannerconnector import MemoryConnector, Raid
+from logutils import LogSampler, log_payload
+
+'''
+****************************************
+* Global variables
+****************************************
+'''
+log = logging.getLogger(__name__)
+_payload_log_sampler = LogSampler(every_n=20)
+
+'''
+****************************************
+* Module functions
+****************************************
+'''
+def create_gym_key(lat:float, lon:float) -> Tuple[float, float]:
+    """key of a gym in raid store. Coordinates are used, because scanner raid queries don't provide gym ids"""
+    return (round(lat, 6), round(lon, 6))
+
+def convert_raid_webhook(message:Dict) -> Raid:
+    """convert 'message' of a RDM/Golbat 'raid' webhook into Raid"""
+    return Raid(
+        gym_name = message.get("gym_name") or message.get("name"),
+        raid_level = int(message["level"]),
+        raid_pokemon_id = int(message.get("pokemon_id") or 0),
+        raid_battle_timestamp = int(message["start"]),
+        raid_end_timestamp = int(message["end"]),
+        atk_fast = int(message.get("move_1") or 0),
+        atk_charge = int(message.get("move_2") or 0),
+        lat = float(message["latitude"]),
+        lon = float(message["longitude"])
+    )
+
+'''
+****************************************
+* Classes
+****************************************
+'''
+
+#****************************************
+# Class: WebhookReceiver
+#****************************************
+class WebhookReceiver():
+    """Local http listener for scanner raid webhooks (RDM/Golbat format: JSON list of {"type": "raid", "message": {...}}).
+
+    Every received raid is stored in raidstore. on_raids(raid_list) is called afterwards (in listener thread) with all raids of the request.
+    """
+
+    def __init__(self, raidstore:MemoryConnector, on_raids:Callable[[List[Raid]], None], host:str="127.0.0.1", port:int=4300) -> None:
+        self._raidstore = raidstore
+        self._on_raids = on_raids
+        handler = type("WebhookRequestHandler", (_WebhookRequestHandler,), {"receiver": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="webhook-receiver", daemon=True)
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        log.info(f"webhook receiver started on http://{host}:{port}")
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def process_payload(self, payload) -> int:
+        """store all raids of webhook payload and return number of processed raids"""
+
+        if isinstance(payload, dict):
+            payload = [payload]
+        raid_list = []
+        for event in payload:
+            if not isinstance(event, dict) or event.get("type") != "raid":
+                continue
+            try:
+                raid = convert_raid_webhook(event["message"])
+            except (KeyError, TypeError, ValueError):
+                log.warning("webhook: invalid raid message ignored")
+                continue
+            self._raidstore.upsert_raid(create_gym_key(raid.lat, raid.lon), raid)
+            raid_list.append(raid)
+        metrics.webhook_raids_total.inc(len(raid_list))
+        if raid_list:
+            self._on_raids(raid_list)
+        return len(raid_list)
+
+class _WebhookRequestHandler(BaseHTTPRequestHandler):
+    receiver = None
+
+    def do_POST(self) -> None:
+        try:
+            content = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            payload = json.loads(content)
+        except ValueError:
+            self.send_error(400)
+            return
+        # answer scanner first, processing must not slow down webhook sender
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        log_payload(log, "webhook payload (sampled): %s", payload, sampler=_payload_log_sampler)
+        try:
+            self.receiver.process_payload(payload)
+        except Exception:
+            log.exception("Exception in webhook processing")
+
+    def log_message(self, format, *args) -> None:
+        pass